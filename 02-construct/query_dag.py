@@ -0,0 +1,158 @@
+"""
+Dependency-aware scheduling of SPARQL query files.
+
+Query files can declare the files they must run after in a header comment,
+placed among the PREFIX declarations before the query body:
+
+    # depends-on: add-net-basic-ref.sparql, fix-rdf-list-termination.sparql
+
+Files without a declaration only keep their alphanumeric position as a
+tie-breaker. run_dag() executes files concurrently as soon as everything
+they depend on has finished, while yielding the results in file order.
+
+Used by 02-construct/run-construct.py and 03-post-process/run-updates.py.
+"""
+
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple, TypeVar
+
+# Header directives recognised in query files
+# (partition is interpreted by run-construct.py, see partition_query())
+KNOWN_DIRECTIVES = {"depends-on", "partition"}
+
+DIRECTIVE_PATTERN = re.compile(r"^#\s*([a-z][a-z-]*)\s*:\s*(.*)$")
+PROLOGUE_PATTERN = re.compile(r"^(PREFIX|BASE)\b", re.IGNORECASE)
+
+R = TypeVar("R")
+
+
+def read_directives(query: str) -> Dict[str, List[str]]:
+    """
+    Read the header directives of a query.
+
+    Only the header is scanned: blank lines, comments and PREFIX/BASE
+    declarations up to the first line of the query body.
+
+    Returns:
+        Dict mapping directive name to its comma-separated values
+    """
+    directives: Dict[str, List[str]] = {}
+    for line in query.lstrip("\ufeff").splitlines():
+        line = line.strip()
+        if not line or PROLOGUE_PATTERN.match(line):
+            continue
+        if not line.startswith("#"):
+            break
+        match = DIRECTIVE_PATTERN.match(line)
+        if match and match.group(1) in KNOWN_DIRECTIVES:
+            values = [v.strip() for v in match.group(2).split(",") if v.strip()]
+            directives.setdefault(match.group(1), []).extend(values)
+    return directives
+
+
+def build_dependencies(files: List[Path]) -> Dict[Path, List[Path]]:
+    """
+    Resolve the depends-on directives of the given query files.
+
+    Dependencies are referenced by file name (with or without the .sparql
+    extension) and must be part of `files`.
+
+    Raises:
+        ValueError: If a dependency does not match exactly one of the files
+    """
+    by_name: Dict[str, List[Path]] = {}
+    for f in files:
+        by_name.setdefault(f.name, []).append(f)
+        by_name.setdefault(f.stem, []).append(f)
+
+    dependencies = {}
+    for f in files:
+        query = f.read_text(encoding="utf-8-sig")
+        resolved = []
+        for name in read_directives(query).get("depends-on", []):
+            matches = by_name.get(name, [])
+            if len(matches) != 1:
+                problem = "unknown" if not matches else "ambiguous"
+                raise ValueError(f"{f.name}: {problem} dependency '{name}'")
+            resolved.append(matches[0])
+        dependencies[f] = resolved
+    return dependencies
+
+
+def topological_order(items: List[Path], dependencies: Dict[Path, List[Path]]) -> List[Path]:
+    """
+    Order items so that every item comes after its dependencies.
+
+    Among items that are ready at the same time the original order is kept,
+    so without any dependencies the input order is returned unchanged.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    ordered = []
+    done = set()
+    pending = list(items)
+    while pending:
+        ready = next((item for item in pending
+                      if all(dep in done for dep in dependencies.get(item, ()))), None)
+        if ready is None:
+            names = ", ".join(item.name for item in pending)
+            raise ValueError(f"Dependency cycle between: {names}")
+        pending.remove(ready)
+        ordered.append(ready)
+        done.add(ready)
+    return ordered
+
+
+def run_dag(items: List[Path], dependencies: Dict[Path, List[Path]],
+            worker: Callable[[Path], R], jobs: int = 1) -> Iterator[Tuple[Path, R]]:
+    """
+    Run `worker` on every item, respecting the dependencies.
+
+    With jobs <= 1 the items run one by one in topological order, in the
+    calling thread. Otherwise up to `jobs` items whose dependencies have all
+    finished run concurrently on a thread pool. Dependencies only constrain
+    ordering: an item still runs when one of its dependencies failed, as the
+    worker reports failures through its result.
+
+    Yields:
+        Tuples of (item, worker result), in the order of `items`
+    """
+    order = topological_order(items, dependencies)
+    results: Dict[Path, R] = {}
+    next_index = 0
+
+    def completed_prefix() -> Iterator[Tuple[Path, R]]:
+        nonlocal next_index
+        while next_index < len(items) and items[next_index] in results:
+            item = items[next_index]
+            next_index += 1
+            yield item, results.pop(item)
+
+    if jobs <= 1:
+        for item in order:
+            results[item] = worker(item)
+            yield from completed_prefix()
+        return
+
+    done = set()
+    pending = list(order)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        while pending or running:
+            # Start every ready item (in topological order) while workers are free
+            for item in list(pending):
+                if len(running) >= jobs:
+                    break
+                if all(dep in done for dep in dependencies.get(item, ())):
+                    pending.remove(item)
+                    running[executor.submit(worker, item)] = item
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                item = running.pop(future)
+                results[item] = future.result()
+                done.add(item)
+            yield from completed_prefix()
@@ -11,15 +11,32 @@ This script:
 
 import os
 import glob
+import hashlib
+import heapq
+import itertools
+import json
+import re
+import shutil
 import subprocess
 import sys
 import argparse
+import tempfile
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import requests
-from typing import List, Tuple
+from query_dag import build_dependencies, read_directives, run_dag, topological_order
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
 import time
 import random
 
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
 # Ensure UTF-8 encoding for Windows console
 if sys.platform == 'win32':
     try:
@@ -30,10 +47,14 @@ if sys.platform == 'win32':
 
 # Configuration
 SOURCE_ENDPOINT = "http://localhost:8082/jena-fuseki/advanced-example-one-eyed/sparql"
+SOURCE_DATA_ENDPOINT = "http://localhost:8082/jena-fuseki/advanced-example-one-eyed/data"
 TARGET_ENDPOINT = "http://localhost:8082/jena-fuseki/advanced-example"
 TARGET_UPDATE_ENDPOINT = f"{TARGET_ENDPOINT}/update"
 TARGET_DATA_ENDPOINT = f"{TARGET_ENDPOINT}/data"
 
+# Reused for all requests to the target endpoint (keeps the connection alive)
+HTTP_SESSION = requests.Session()
+
 # Oxigraph Docker configuration
 OXIGRAPH_CONTAINER_NAME = "era-oxigraph-temp"
 OXIGRAPH_PORT = None  # Will be set dynamically
@@ -43,26 +64,94 @@ OXIGRAPH_UPDATE_ENDPOINT = None  # Will be set after container starts
 # Directory containing SPARQL queries
 CONSTRUCT_DIR = Path("./")
 
+# Helper queries, run before the mapping queries. Their results are loaded into
+# a named graph of the source, so lookups shared by several mapping queries
+# (micro-level elements, meso-to-micro expansion) are evaluated only once.
+HELPER_DIR = CONSTRUCT_DIR / "00-helpers"
+HELPER_GRAPH = "https://data.matdata.eu/helper#graph"
+
+# References to the helper graph in a query, with the strings and comments
+# around them so that a mention inside those is not taken for one
+HELPER_GRAPH_PATTERN = re.compile(
+    r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+    r'|#[^\n]*|(<' + re.escape(HELPER_GRAPH) + r'>|(?<![\w:?$])helper:graph(?![\w-]|\.\w))')
+
 # Input/Output files
 INPUT_TTL_FILE = "../01-prep/output/one-eyed-graph.ttl"
 OUTPUT_TTL_FILE = "output/era-graph.ttl"
+OUTPUT_TRIG_FILE = "output/era-graph.trig"  # One named graph per query (--named-graphs)
+
+# Named graph of each query's result with --named-graphs: base + query path without .sparql
+QUERY_GRAPH_BASE = "https://data.matdata.eu/graph/construct/"
+
+# CONSTRUCT results are streamed as N-Triples (a subset of Turtle), so they can
+# be appended to the output file without any parsing or prefix handling
+NTRIPLES_CONTENT_TYPE = "application/n-triples"
+STREAM_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Chunk size of the bulk-load upload (--bulk-load)
+SORT_RUN_LINES = 200_000  # Lines sorted in memory at a time when merging shard results
+
+# On-disk cache of CONSTRUCT results, keyed by query text, input graph and source
+# Tokens of a query that matter for finding its outermost WHERE group: strings,
+# IRIs and comments (which may contain braces), braces and keywords
+QUERY_TOKEN_PATTERN = re.compile(
+    r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+    r'|<[^<>"{}|^`\\\x00-\x20]*>|#[^\n]*|[{}]|(?<![\w:?$])(?:WHERE|CONSTRUCT|LIMIT|OFFSET)(?![\w:-])',
+    re.IGNORECASE)
+
+CACHE_DIR = Path(".cache/construct")
+CACHE_MAX_MB = 512  # Least recently used results are evicted above this size
+
+# Per-query performance report (compared against the previous run's JSON)
+REPORT_JSON_FILE = "output/construct-report.json"
+REPORT_MD_FILE = "output/construct-report.md"
+REGRESSION_FACTOR = 1.5  # Flag queries that got this much slower...
+REGRESSION_MIN_SECONDS = 0.5  # ...and lost at least this many seconds
 
 # Track if Fuseki endpoints are available
 SOURCE_FUSEKI_AVAILABLE = False
 TARGET_FUSEKI_AVAILABLE = False
 OXIGRAPH_CONTAINER_ID = None  # Track Oxigraph container for cleanup
+EMBEDDED_STORE = None  # In-process pyoxigraph store (offline fallback)
+RUN_HELPER_GRAPH = HELPER_GRAPH  # Helper graph of this run (unique per run on a Fuseki source)
+CACHE_ENABLED = False
+PARTITIONING_ENABLED = True  # Honour `# partition:` headers (disabled by --no-partition)
+BULK_LOAD_ENABLED = False  # Replace the target graph once at the end (--bulk-load)
+NAMED_GRAPHS_ENABLED = False  # One target graph per query (--named-graphs)
+PREVIOUS_GRAPH_HASHES = {}  # Named graph IRI -> SHA-256 of the result loaded by the previous run
+INPUT_GRAPH_HASH = None  # SHA-256 of the source data, set when the cache is enabled
+HELPER_QUERIES_HASH = ""  # SHA-256 of the helper queries the source graph was extended with
 
 
 def find_sparql_queries() -> List[Path]:
-    """Find all .sparql files in the era-construct directory, sorted by path."""
+    """Find all .sparql files in the era-construct directory (except helpers), sorted by path."""
     pattern = str(CONSTRUCT_DIR / "**" / "*.sparql")
     files = [Path(f) for f in glob.glob(pattern, recursive=True)]
-    return sorted(files)
+    return sorted(f for f in files if HELPER_DIR not in f.parents)
+
+
+def find_helper_queries() -> List[Path]:
+    """Find the helper .sparql files, sorted by path."""
+    return sorted(HELPER_DIR.glob("*.sparql"))
+
+
+def reads_helper_graph(query: str) -> bool:
+    """Check whether a query reads the helper graph (mentions in comments and strings do not count)."""
+    return any(match.group(1) for match in HELPER_GRAPH_PATTERN.finditer(query))
+
+
+def with_run_helper_graph(query: str) -> str:
+    """Point the helper graph references of a query to RUN_HELPER_GRAPH."""
+    if RUN_HELPER_GRAPH == HELPER_GRAPH:
+        return query
+    return HELPER_GRAPH_PATTERN.sub(
+        lambda match: f"<{RUN_HELPER_GRAPH}>" if match.group(1) else match.group(0), query)
 
 
 def read_query(file_path: Path) -> str:
     """Read SPARQL query from file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
+    # utf-8-sig strips the BOM some query files start with
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
         return f.read()
 
 
@@ -180,42 +269,233 @@ def load_data_to_oxigraph() -> bool:
         return False
 
 
-def execute_construct_query(query: str) -> str:
-    """Execute CONSTRUCT query against source endpoint or Oxigraph and return Turtle."""
+def load_embedded_store() -> bool:
+    """
+    Load the source TTL file into an in-process pyoxigraph store.
+    
+    Returns:
+        bool: True if data loaded successfully, False otherwise
+    """
+    global EMBEDDED_STORE
+    
+    try:
+        print(f"  Loading data from {INPUT_TTL_FILE} into embedded Oxigraph store...")
+        start = time.perf_counter()
+        store = pyoxigraph.Store()
+        store.bulk_load(path=INPUT_TTL_FILE, format=pyoxigraph.RdfFormat.TURTLE)
+        EMBEDDED_STORE = store
+        print(f"  ✓ Loaded {len(store)} triples in {time.perf_counter() - start:.2f}s")
+        return True
+    except Exception as e:
+        print(f"  ❌ Failed to load data into embedded store: {e}")
+        return False
+
+
+def execute_construct_query(query: str, destination: BinaryIO) -> float:
+    """
+    Execute CONSTRUCT query against source endpoint, embedded store or Oxigraph.
+    
+    The response is requested as N-Triples and streamed chunk by chunk into
+    `destination`, so it is never held in memory as a whole. References to
+    the helper graph are pointed to this run's helper graph first (see
+    with_run_helper_graph()).
+    
+    Args:
+        query: The CONSTRUCT query
+        destination: Binary file the N-Triples are written to
+    
+    Returns:
+        float: Server time in seconds, i.e. until the response headers arrived
+        (for the embedded store, evaluation and serialization together)
+    """
+    query = with_run_helper_graph(query)
+    start = time.perf_counter()
     if SOURCE_FUSEKI_AVAILABLE:
         # Query remote Fuseki endpoint
-        response = requests.post(
-            SOURCE_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'text/turtle'},
-            timeout=60
-        )
-        response.raise_for_status()
-        return response.text
+        endpoint = SOURCE_ENDPOINT
+    elif EMBEDDED_STORE is not None:
+        # Query the in-process store; pyoxigraph serializes straight into the file
+        EMBEDDED_STORE.query(query).serialize(destination, pyoxigraph.RdfFormat.N_TRIPLES)
+        return time.perf_counter() - start
     elif OXIGRAPH_CONTAINER_ID:
         # Query Oxigraph container
-        response = requests.post(
-            OXIGRAPH_QUERY_ENDPOINT,
-            data={'query': query},
-            headers={'Accept': 'text/turtle'},
-            timeout=60
-        )
+        endpoint = OXIGRAPH_QUERY_ENDPOINT
+    else:
+        raise RuntimeError("No SPARQL endpoint available (neither Fuseki nor Oxigraph)")
+    
+    with requests.post(
+        endpoint,
+        data={'query': query},
+        headers={'Accept': NTRIPLES_CONTENT_TYPE},
+        timeout=60,
+        stream=True
+    ) as response:
+        server_time = time.perf_counter() - start
         response.raise_for_status()
-        return response.text
+        last_byte = b'\n'
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if chunk:
+                destination.write(chunk)
+                last_byte = chunk[-1:]
+        # Keep the concatenated output line-aligned
+        if last_byte != b'\n':
+            destination.write(b'\n')
+    return server_time
+
+
+def insert_triples(ntriples_file: Path) -> None:
+    """Insert the N-Triples file into the target endpoint using the Graph Store Protocol."""
+    # The file object is streamed as the request body instead of read into memory
+    with open(ntriples_file, 'rb') as f:
+        response = HTTP_SESSION.post(
+            TARGET_DATA_ENDPOINT,
+            data=f,
+            headers={'Content-Type': NTRIPLES_CONTENT_TYPE},
+            params={'default': ''},  # Insert into default graph
+            timeout=120
+        )
+    response.raise_for_status()
+
+
+def load_helper_graph(ntriples_file: Path) -> None:
+    """
+    Replace the helper graph of the source with the given N-Triples file.
+    
+    The helper graph is a named graph, so the default graph the mapping
+    queries read from is left untouched. On a Fuseki source it is written
+    under RUN_HELPER_GRAPH, unique to this run, so concurrent runs sharing
+    the source dataset do not overwrite each other's helper graph; main()
+    drops it again when the run ends (see drop_helper_graph()).
+    """
+    if SOURCE_FUSEKI_AVAILABLE:
+        endpoint = SOURCE_DATA_ENDPOINT
+    elif EMBEDDED_STORE is not None:
+        graph = pyoxigraph.NamedNode(RUN_HELPER_GRAPH)
+        EMBEDDED_STORE.clear_graph(graph)
+        EMBEDDED_STORE.load(path=ntriples_file, format=pyoxigraph.RdfFormat.N_TRIPLES,
+                            to_graph=graph)
+        return
+    elif OXIGRAPH_CONTAINER_ID:
+        endpoint = f"http://localhost:{OXIGRAPH_PORT}/store"
     else:
         raise RuntimeError("No SPARQL endpoint available (neither Fuseki nor Oxigraph)")
+    
+    # PUT replaces the graph content (Graph Store Protocol)
+    with open(ntriples_file, 'rb') as f:
+        response = requests.put(
+            endpoint,
+            data=f,
+            headers={'Content-Type': NTRIPLES_CONTENT_TYPE},
+            params={'graph': RUN_HELPER_GRAPH},
+            timeout=120
+        )
+    response.raise_for_status()
 
 
-def insert_triples(turtle_data: str) -> None:
-    """Insert triples into target endpoint using SPARQL UPDATE."""
-    # Use INSERT DATA with turtle format
-    # For larger datasets, we'll use the graph store protocol instead
+def drop_helper_graph() -> None:
+    """Remove this run's helper graph from the source Fuseki dataset again."""
+    response = requests.delete(
+        SOURCE_DATA_ENDPOINT,
+        params={'graph': RUN_HELPER_GRAPH},
+        timeout=30
+    )
+    # 404: the graph was never created
+    if response.status_code != 404:
+        response.raise_for_status()
+
+
+def helper_graph_in_default_graph(ntriples_file: Path) -> bool:
+    """
+    Check whether the source's default graph shows the helper triples.
+    
+    A source whose default graph is the union of its named graphs would
+    mix the helper graph into every mapping query. One helper triple is
+    looked up outside of any GRAPH block to find out.
+    """
+    with open(ntriples_file, 'rb') as f:
+        triple = next((line.strip() for line in f if line.strip()), b'')
+    if not triple:
+        return False
     response = requests.post(
+        SOURCE_ENDPOINT,
+        data={'query': f"ASK {{ {triple.decode('utf-8').rstrip('.').strip()} }}"},
+        headers={'Accept': 'application/sparql-results+json'},
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()['boolean']
+
+
+def query_graph_iri(file_path: Path) -> str:
+    """Return the named graph a query's result is loaded into with --named-graphs."""
+    return QUERY_GRAPH_BASE + file_path.with_suffix('').as_posix()
+
+
+def replace_named_graph(ntriples_file: Path, graph_iri: str) -> None:
+    """Replace one named graph of the target with an N-Triples file (Graph Store Protocol PUT)."""
+    with open(ntriples_file, 'rb') as f:
+        response = HTTP_SESSION.put(
+            TARGET_DATA_ENDPOINT,
+            data=f,
+            headers={'Content-Type': NTRIPLES_CONTENT_TYPE},
+            params={'graph': graph_iri},
+            timeout=120
+        )
+    response.raise_for_status()
+
+
+def drop_named_graph(graph_iri: str) -> None:
+    """Delete one named graph from the target."""
+    response = HTTP_SESSION.delete(
+        TARGET_DATA_ENDPOINT,
+        params={'graph': graph_iri},
+        timeout=30
+    )
+    # 404: the graph does not exist (anymore)
+    if response.status_code != 404:
+        response.raise_for_status()
+
+
+def iter_upload_chunks(file_path: Path, compress: bool = False) -> Iterator[bytes]:
+    """
+    Yield a file in chunks, gzip-compressing them on the fly if requested.
+    
+    requests sends a generator body with chunked transfer encoding, so
+    neither the file nor its compressed form is ever held in memory.
+    """
+    # wbits=31 produces a gzip (not zlib) stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def replace_target_graph(ntriples_file: Path, compress: bool = False) -> None:
+    """
+    Replace the target's default graph with an N-Triples file in one request.
+    
+    A Graph Store Protocol PUT is applied by Fuseki in a single transaction,
+    so the target switches from the old to the new graph at once and never
+    serves a partially loaded graph.
+    
+    Args:
+        ntriples_file: Combined N-Triples output of all queries
+        compress: Send the body gzip-compressed (Content-Encoding: gzip)
+    """
+    headers = {'Content-Type': NTRIPLES_CONTENT_TYPE}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    response = HTTP_SESSION.put(
         TARGET_DATA_ENDPOINT,
-        data=turtle_data.encode('utf-8'),
-        headers={'Content-Type': 'text/turtle'},
-        params={'default': ''},  # Insert into default graph
-        timeout=120
+        data=iter_upload_chunks(ntriples_file, compress),
+        headers=headers,
+        params={'default': ''},  # Replace the default graph
+        timeout=600
     )
     response.raise_for_status()
 
@@ -224,7 +504,7 @@ def check_fuseki_availability() -> bool:
     """Check if Fuseki target endpoint is available."""
     try:
         # Use ASK query to test endpoint
-        response = requests.post(
+        response = HTTP_SESSION.post(
             f"{TARGET_ENDPOINT}/query",
             data={'query': 'ASK { }'  },
             timeout=5
@@ -251,7 +531,7 @@ def check_source_endpoint_availability() -> bool:
 def clear_target_endpoint() -> None:
     """Clear all data from the target endpoint."""
     update_query = "CLEAR DEFAULT"
-    response = requests.post(
+    response = HTTP_SESSION.post(
         TARGET_UPDATE_ENDPOINT,
         data={'update': update_query},
         timeout=30
@@ -260,53 +540,642 @@ def clear_target_endpoint() -> None:
     print("✓ Cleared target endpoint")
 
 
-def process_query_file(file_path: Path) -> Tuple[bool, str, str]:
+def read_partition(query: str) -> Optional[Tuple[str, int]]:
+    """
+    Read the `# partition: ?variable shards` header directive of a query.
+    
+    Returns:
+        Tuple of (variable: str, shards: int), or None if the query is not partitioned
+    
+    Raises:
+        ValueError: If the directive is malformed
+    """
+    values = read_directives(query).get('partition')
+    if not values:
+        return None
+    parts = values[0].split()
+    if len(parts) != 2 or not parts[0].startswith('?') or not parts[1].isdigit():
+        raise ValueError(f"Invalid partition directive '{values[0]}' (expected '?variable shards')")
+    shards = int(parts[1])
+    if not 1 <= shards <= 16:
+        raise ValueError(f"Partition shard count must be between 1 and 16, got {shards}")
+    return parts[0], shards
+
+
+def outer_where_end(query: str) -> int:
+    """
+    Find the closing brace of a query's outermost WHERE group.
+    
+    Braces inside strings, IRIs and comments are skipped, and groups nested
+    in the WHERE clause (sub-selects, OPTIONAL, ...) are matched, so VALUES
+    blocks and solution modifiers after the group are left alone.
+    LIMIT and OFFSET after the group would apply to each shard, so queries
+    using them are rejected.
+    
+    Returns:
+        int: Offset of the closing brace in `query`
+    
+    Raises:
+        ValueError: If the query has no `WHERE { ... }` clause after its
+            template (e.g. the `CONSTRUCT WHERE` short form, whose pattern
+            cannot hold a FILTER), or a top-level LIMIT or OFFSET
+    """
+    end = None
+    depth = 0
+    template_seen = False  # A top-level group before WHERE (the CONSTRUCT template)
+    construct = False
+    in_where = False
+    for match in QUERY_TOKEN_PATTERN.finditer(query):
+        token = match.group()
+        if token == '{':
+            if depth == 0 and not in_where:
+                template_seen = True
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth < 0:
+                break
+            if depth == 0 and in_where and end is None:
+                end = match.start()
+        elif depth == 0 and end is not None and token.upper() in ('LIMIT', 'OFFSET'):
+            raise ValueError(f"A query with a top-level {token.upper()} cannot be partitioned")
+        elif depth == 0 and token.upper() == 'CONSTRUCT':
+            construct = True
+        elif depth == 0 and token.upper() == 'WHERE':
+            if construct and not template_seen:
+                raise ValueError("The CONSTRUCT WHERE short form cannot be partitioned")
+            in_where = True
+    if end is None:
+        raise ValueError("Cannot find the outermost WHERE { ... } group to partition")
+    return end
+
+
+def partition_query(query: str, variable: str, shards: int, shard: int) -> str:
+    """
+    Restrict a query to one hash bucket of a variable's values.
+    
+    A FILTER on the first hex digit of MD5(STR(variable)) is injected at the
+    end of the outermost WHERE group (see outer_where_end()), so the shards
+    are disjoint and together cover all solutions. The variable must be
+    bound (to an IRI or literal) in the outermost group, not only inside an
+    OPTIONAL.
+    
+    Raises:
+        ValueError: If the query's WHERE group cannot be found
+    """
+    digits = ", ".join(f'"{d:x}"' for d in range(16) if d % shards == shard)
+    shard_filter = (f"  # Shard {shard + 1}/{shards}, injected by run-construct.py\n"
+                    f"  FILTER (SUBSTR(MD5(STR({variable})), 1, 1) IN ({digits}))\n")
+    end = outer_where_end(query)
+    if not query[:end].endswith('\n'):
+        shard_filter = '\n' + shard_filter
+    return query[:end] + shard_filter + query[end:]
+
+
+def execute_partitioned_query(query: str, variable: str, shards: int, part_file: Path) -> float:
+    """
+    Execute a query as concurrent shards and union their results into part_file.
+    
+    Triples that do not depend on the partition variable (e.g. shared
+    constant resources) can come from more than one shard, so the shard
+    results are merged without repeats (see merge_unique_lines()) and the
+    triple count of the report matches an unpartitioned run.
+    
+    Returns:
+        float: Server time of the slowest shard in seconds
+    """
+    shard_files = [part_file.with_suffix(f".shard{i}.nt") for i in range(shards)]
+    
+    def run_shard(shard: int) -> float:
+        with open(shard_files[shard], 'wb') as f:
+            return execute_construct_query(partition_query(query, variable, shards, shard), f)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=shards) as executor:
+            server_times = list(executor.map(run_shard, range(shards)))
+        
+        with open(part_file, 'wb') as output:
+            merge_unique_lines(shard_files, output)
+        return max(server_times)
+    finally:
+        for shard_file in shard_files:
+            shard_file.unlink(missing_ok=True)
+
+
+def merge_unique_lines(files: List[Path], output: BinaryIO) -> None:
+    """
+    Write the distinct lines of N-Triples files to output, sorted (like `sort -u`).
+    
+    Each file is split into sorted runs of at most SORT_RUN_LINES lines on
+    disk, which are then merged, so memory does not grow with the output.
+    """
+    run_files = []
+    try:
+        for path in files:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = list(itertools.islice(f, SORT_RUN_LINES))
+                    if not chunk:
+                        break
+                    lines = sorted(line if line.endswith(b'\n') else line + b'\n'
+                                   for line in chunk if line.strip())
+                    run_file = path.with_suffix(f".run{len(run_files)}.nt")
+                    run_files.append(run_file)
+                    with open(run_file, 'wb') as run:
+                        run.writelines(lines)
+        
+        runs = [open(run_file, 'rb') for run_file in run_files]
+        try:
+            previous = None
+            for line in heapq.merge(*runs):
+                if line != previous:
+                    output.write(line)
+                    previous = line
+        finally:
+            for run in runs:
+                run.close()
+    finally:
+        for run_file in run_files:
+            run_file.unlink(missing_ok=True)
+
+
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ntriples_stats(file_path: Path) -> Tuple[int, int]:
+    """
+    Count the triples and distinct subjects of an N-Triples file, line by line.
+    
+    Returns:
+        Tuple of (triple_count: int, distinct_subject_count: int)
+    """
+    triple_count = 0
+    subjects = set()
+    with open(file_path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(b'#'):
+                continue
+            triple_count += 1
+            subjects.add(line.split(None, 1)[0])
+    return triple_count, len(subjects)
+
+
+def source_identity() -> str:
+    """Identify the SPARQL source currently queried, for use in cache keys."""
+    if SOURCE_FUSEKI_AVAILABLE:
+        return SOURCE_ENDPOINT
+    elif EMBEDDED_STORE is not None:
+        return f"pyoxigraph {pyoxigraph.__version__}"
+    return "oxigraph-docker"
+
+
+def source_fingerprint() -> str:
+    """
+    Hash the default graph the source Fuseki endpoint serves.
+    
+    The graph is streamed as N-Triples (Graph Store Protocol GET) into the
+    digest, so it is never held in memory.
+    
+    Returns:
+        str: SHA-256 of the graph, the source fingerprint of the cache keys
+        (serving the triples in another order only causes cache misses,
+        never stale hits)
+    """
+    digest = hashlib.sha256()
+    with requests.get(
+        SOURCE_DATA_ENDPOINT,
+        params={'default': ''},
+        headers={'Accept': NTRIPLES_CONTENT_TYPE},
+        timeout=600,
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(query: str) -> str:
+    """
+    Build the cache key of a query result.
+    
+    The key covers the query text, the source data (the one-eyed graph file
+    loaded into a local source, or the graph a source Fuseki endpoint
+    serves, see source_fingerprint()), the helper queries and the source
+    identity, so editing a single mapping query only invalidates that
+    query's result (editing a helper query invalidates all of them).
+    """
+    digest = hashlib.sha256()
+    for part in (query, INPUT_GRAPH_HASH, HELPER_QUERIES_HASH, source_identity()):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def cache_lookup(key: str) -> Optional[Path]:
+    """Return the cached N-Triples file for a key, marking it as recently used."""
+    cached = CACHE_DIR / f"{key}.nt"
+    try:
+        os.utime(cached)
+    except FileNotFoundError:
+        return None
+    return cached
+
+
+def cache_store(key: str, part_file: Path) -> None:
+    """Store a query result in the cache (atomically, as queries may run concurrently)."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = CACHE_DIR / f"{key}.{os.getpid()}.{id(part_file)}.tmp"
+    shutil.copyfile(part_file, tmp_file)
+    os.replace(tmp_file, CACHE_DIR / f"{key}.nt")
+
+
+def evict_cache(max_bytes: int) -> int:
+    """
+    Delete least recently used cache entries until the cache fits in max_bytes.
+    
+    Returns:
+        int: Number of evicted entries
+    """
+    if not CACHE_DIR.exists():
+        return 0
+    entries = sorted(
+        (entry.stat().st_mtime, entry.stat().st_size, entry)
+        for entry in CACHE_DIR.glob("*.nt")
+    )
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        entry.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+def process_query_file(file_path: Path, part_file: Path,
+                       log: Callable[[str], None] = print,
+                       insert: bool = True) -> Tuple[bool, str, Dict]:
     """
     Process a single SPARQL query file.
     
+    Args:
+        file_path: Path to the .sparql file
+        part_file: File the query's N-Triples result is streamed into
+        log: Function used to report progress (defaults to print)
+        insert: Whether to insert the result into the target endpoint
+    
     Returns:
-        Tuple of (success: bool, message: str, turtle_data: str)
+        Tuple of (success: bool, message: str, stats: dict) where stats is
+        the query's row in the performance report
     """
+    start = time.perf_counter()
+    stats = {
+        'query': file_path.as_posix(),
+        'success': False,
+        'cached': False,
+        'wall_s': None,
+        'server_s': None,
+        'transfer_s': None,
+        'bytes': 0,
+        'triples': 0,
+        'subjects': 0,
+        'insert_s': None,
+        'reads_helpers': False,
+        'sha256': None,
+        'graph': None,
+        'graph_unchanged': False,
+    }
     try:
-        print(f"\n📄 Processing: {file_path}")
+        log(f"\n📄 Processing: {file_path}")
         
         # Read the query
         query = read_query(file_path)
+        stats['reads_helpers'] = reads_helper_graph(query)
         
-        # Execute CONSTRUCT query
-        print("  ⏳ Executing CONSTRUCT query...")
-        turtle_data = execute_construct_query(query)
+        key = cache_key(query) if CACHE_ENABLED else None
+        cached = cache_lookup(key) if key else None
         
-        # Count triples (rough estimate)
-        triple_count = turtle_data.count('\n') - turtle_data.count('@prefix')
-        print(f"  ✓ Generated ~{triple_count} triples")
+        fetch_start = time.perf_counter()
+        if cached:
+            # Reuse the stored result of an unchanged query
+            shutil.copyfile(cached, part_file)
+            stats['cached'] = True
+            stats['server_s'] = 0.0
+        else:
+            partition = read_partition(query) if PARTITIONING_ENABLED else None
+            if partition:
+                # Execute CONSTRUCT query as concurrent shards
+                variable, shards = partition
+                log(f"  ⏳ Executing CONSTRUCT query in {shards} shards over {variable}...")
+                stats['server_s'] = execute_partitioned_query(query, variable, shards, part_file)
+            else:
+                # Execute CONSTRUCT query
+                log("  ⏳ Executing CONSTRUCT query...")
+                with open(part_file, 'wb') as f:
+                    stats['server_s'] = execute_construct_query(query, f)
+            if key:
+                cache_store(key, part_file)
+        stats['transfer_s'] = time.perf_counter() - fetch_start - stats['server_s']
         
-        # Insert into target endpoint if available
-        if TARGET_FUSEKI_AVAILABLE:
-            print("  ⏳ Inserting triples into target endpoint...")
+        stats['bytes'] = part_file.stat().st_size
+        stats['triples'], stats['subjects'] = ntriples_stats(part_file)
+        stats['sha256'] = file_sha256(part_file)
+        if cached:
+            log(f"  ♻️  Reused cached result ({stats['triples']} triples)")
+        else:
+            log(f"  ✓ Generated {stats['triples']} triples in "
+                f"{time.perf_counter() - fetch_start:.2f}s")
+        
+        # Replace the query's named graph, unless the previous run loaded the same result
+        if insert and TARGET_FUSEKI_AVAILABLE and NAMED_GRAPHS_ENABLED:
+            graph_iri = query_graph_iri(file_path)
+            if PREVIOUS_GRAPH_HASHES.get(graph_iri) == stats['sha256']:
+                stats['graph'] = graph_iri
+                stats['graph_unchanged'] = True
+                log(f"  ♻️  Result unchanged, keeping graph <{graph_iri}>")
+            else:
+                log(f"  ⏳ Replacing graph <{graph_iri}>...")
+                insert_start = time.perf_counter()
+                try:
+                    replace_named_graph(part_file, graph_iri)
+                    stats['insert_s'] = time.perf_counter() - insert_start
+                    stats['graph'] = graph_iri
+                    log("  ✓ Replaced successfully")
+                except Exception as e:
+                    log(f"  ⚠️  Warning: Failed to replace graph in Fuseki: {e}")
+        
+        # Insert into target endpoint if available (--bulk-load inserts at the end)
+        elif insert and TARGET_FUSEKI_AVAILABLE and not BULK_LOAD_ENABLED:
+            log("  ⏳ Inserting triples into target endpoint...")
+            insert_start = time.perf_counter()
             try:
-                insert_triples(turtle_data)
-                print("  ✓ Inserted successfully")
+                insert_triples(part_file)
+                stats['insert_s'] = time.perf_counter() - insert_start
+                log("  ✓ Inserted successfully")
             except Exception as e:
-                print(f"  ⚠️  Warning: Failed to insert to Fuseki: {e}")
+                log(f"  ⚠️  Warning: Failed to insert to Fuseki: {e}")
         
-        return True, f"Success: {file_path.name}", turtle_data
+        stats['success'] = True
+        return True, f"Success: {file_path.name}", stats
         
     except Exception as e:
         error_msg = f"Error processing {file_path.name}: {str(e)}"
-        print(f"  ❌ {error_msg}")
-        return False, error_msg, ""
+        log(f"  ❌ {error_msg}")
+        return False, error_msg, stats
+    finally:
+        stats['wall_s'] = time.perf_counter() - start
+
+
+def process_query_files(query_files: List[Path], dependencies: Dict[Path, List[Path]],
+                        part_dir: Path, jobs: int = 1) -> Iterator[Tuple[Path, bool, str, Path, Dict]]:
+    """
+    Process all query files, optionally fanning out over a thread pool.
+    
+    Each query's result is streamed into its own part file in `part_dir`.
+    Queries run in dependency order (see query_dag.py): with jobs > 1 up to
+    `jobs` queries whose `# depends-on:` files have finished run concurrently.
+    Each worker buffers its progress messages, which are printed once the
+    query's result is collected, so the console output and the yielded
+    results keep the same file order as a serial run.
+    
+    Yields:
+        Tuples of (query_file, success, message, part_file, stats), in the order of query_files
+    """
+    part_files = {f: part_dir / f"{i:03d}-{f.stem}.nt" for i, f in enumerate(query_files)}
+    if jobs <= 1:
+        def run(file_path: Path) -> Tuple[List[str], Tuple[bool, str, Dict]]:
+            return [], process_query_file(file_path, part_files[file_path])
+    else:
+        def run(file_path: Path) -> Tuple[List[str], Tuple[bool, str, Dict]]:
+            lines = []
+            result = process_query_file(file_path, part_files[file_path], log=lines.append)
+            return lines, result
+    
+    for query_file, (lines, (success, message, stats)) in run_dag(
+            query_files, dependencies, run, jobs):
+        for line in lines:
+            print(line)
+        yield query_file, success, message, part_files[query_file], stats
+
+
+def materialize_helpers(helper_files: List[Path], work_dir: Path) -> Tuple[bool, Dict]:
+    """
+    Run the helper queries and load their combined result into the helper graph.
+    
+    Helper results go through the same cache as the mapping queries, but are
+    not inserted into the target endpoint.
+    
+    Returns:
+        Tuple of (success: bool, helper_report: dict) where helper_report
+        holds the helper queries' stats and the time to load the graph
+    """
+    helper_report = {'queries': [], 'load_s': None, 'saved_s': None}
+    helper_file = work_dir / "helpers.nt"
+    with open(helper_file, 'wb') as output:
+        for i, file_path in enumerate(helper_files):
+            part_file = work_dir / f"helper-{i:03d}.nt"
+            success, _, stats = process_query_file(file_path, part_file, insert=False)
+            helper_report['queries'].append(stats)
+            if not success:
+                return False, helper_report
+            with open(part_file, 'rb') as part:
+                shutil.copyfileobj(part, output, STREAM_CHUNK_SIZE)
+            part_file.unlink()
+    
+    print(f"\n⏳ Loading helper results into <{RUN_HELPER_GRAPH}>...")
+    start = time.perf_counter()
+    try:
+        load_helper_graph(helper_file)
+        if SOURCE_FUSEKI_AVAILABLE and helper_graph_in_default_graph(helper_file):
+            print("  ❌ The source's default graph includes its named graphs, so the helper "
+                  "graph would leak into every mapping query")
+            return False, helper_report
+    except Exception as e:
+        print(f"  ❌ Failed to load helper graph: {e}")
+        return False, helper_report
+    helper_report['load_s'] = time.perf_counter() - start
+    triples = sum(stats['triples'] for stats in helper_report['queries'])
+    print(f"  ✓ Loaded {triples} helper triples in {helper_report['load_s']:.2f}s")
+    return True, helper_report
+
+
+def load_previous_report() -> Dict:
+    """Load the previous run's report (empty if there is none)."""
+    try:
+        with open(REPORT_JSON_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def estimate_helper_savings(run_stats: List[Dict], helper_report: Dict,
+                            previous_report: Dict) -> Optional[float]:
+    """
+    Estimate the time the helper graphs saved compared to the previous run.
+    
+    The queries that read the helper graph plus the helper stage are compared
+    with the same queries plus the helper stage (if any) of the previous run.
+    For a run right after a query was switched to the helper graph this is
+    the time the materialization saves. Only executed (not cached) runs of
+    all these queries are comparable, e.g. two runs with --no-cache.
+    
+    Returns:
+        float: Seconds saved (negative if slower), or None if not comparable
+    """
+    previous_rows = {row.get('query'): row for row in previous_report.get('queries', [])}
+    previous_helpers = previous_report.get('helpers') or {'queries': [], 'load_s': 0.0}
+    consumers = [stats for stats in run_stats if stats['reads_helpers']]
+    if not consumers:
+        return None
+    
+    current_rows = consumers + helper_report['queries']
+    previous_consumers = [previous_rows.get(stats['query']) for stats in consumers]
+    compared_rows = current_rows + previous_consumers + previous_helpers['queries']
+    if not all(row and row.get('success') and not row.get('cached') for row in compared_rows):
+        return None
+    
+    current = sum(row['wall_s'] for row in current_rows) + (helper_report['load_s'] or 0.0)
+    previous = (sum(row['wall_s'] for row in previous_consumers + previous_helpers['queries'])
+                + (previous_helpers.get('load_s') or 0.0))
+    return previous - current
+
+
+def compare_with_previous(stats: Dict, previous: Optional[Dict]) -> List[str]:
+    """Return the regressions of a query compared to its previous run."""
+    if not previous or not previous.get('success') or not stats['success']:
+        return []
+    flags = []
+    # Cached runs are not comparable to executed ones
+    if not stats['cached'] and not previous.get('cached') and previous.get('wall_s'):
+        slower = stats['wall_s'] - previous['wall_s']
+        if (stats['wall_s'] > previous['wall_s'] * REGRESSION_FACTOR
+                and slower >= REGRESSION_MIN_SECONDS):
+            flags.append(f"slower: {previous['wall_s']:.2f}s → {stats['wall_s']:.2f}s")
+    if stats['triples'] != previous.get('triples'):
+        flags.append(f"triples: {previous.get('triples')} → {stats['triples']}")
+    return flags
+
+
+def write_run_report(run_stats: List[Dict], total_seconds: float, jobs: int,
+                     helper_report: Dict) -> List[Dict]:
+    """
+    Write the per-query performance report as JSON and as a markdown table.
+    
+    The previous JSON report is read first, so each query can be compared
+    against its last run and the helper graphs' savings can be estimated.
+    
+    Returns:
+        List of the query stats that were flagged as regressions
+    """
+    previous_report = load_previous_report()
+    previous = {row.get('query'): row for row in previous_report.get('queries', [])}
+    helper_report['saved_s'] = estimate_helper_savings(run_stats, helper_report, previous_report)
+    for stats in run_stats:
+        stats['regressions'] = compare_with_previous(stats, previous.get(stats['query']))
+    regressions = [stats for stats in run_stats if stats['regressions']]
+    
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'source': source_identity(),
+        'jobs': jobs,
+        'total_s': total_seconds,
+        'queries': run_stats,
+        'helpers': helper_report,
+    }
+    Path(REPORT_JSON_FILE).parent.mkdir(parents=True, exist_ok=True)
+    with open(REPORT_JSON_FILE, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    def fmt(seconds: Optional[float]) -> str:
+        return '' if seconds is None else f"{seconds:.3f}"
+    
+    with open(REPORT_MD_FILE, 'w', encoding='utf-8') as f:
+        f.write("# CONSTRUCT Performance Report\n\n")
+        f.write(f"**Date:** {report['date']}\n\n")
+        f.write(f"**Source:** {report['source']}\n\n")
+        f.write(f"**Total:** {total_seconds:.2f}s with {jobs} job(s)\n\n")
+        f.write("| Query | Status | Wall (s) | Server (s) | Transfer (s) | Bytes | Triples | Subjects | Insert (s) | Regressions |\n")
+        f.write("|-------|--------|----------|------------|--------------|-------|---------|----------|------------|-------------|\n")
+        for stats in run_stats:
+            status = ('cached' if stats['cached'] else 'ok') if stats['success'] else 'failed'
+            insert = 'unchanged' if stats['graph_unchanged'] else fmt(stats['insert_s'])
+            f.write(f"| `{stats['query']}` | {status} | {fmt(stats['wall_s'])} | "
+                    f"{fmt(stats['server_s'])} | {fmt(stats['transfer_s'])} | {stats['bytes']} | "
+                    f"{stats['triples']} | {stats['subjects']} | {insert} | "
+                    f"{'; '.join(stats['regressions'])} |\n")
+        
+        if helper_report['queries']:
+            f.write("\n## Helper Graphs\n\n")
+            f.write("| Helper | Status | Wall (s) | Triples |\n")
+            f.write("|--------|--------|----------|---------|\n")
+            for stats in helper_report['queries']:
+                status = ('cached' if stats['cached'] else 'ok') if stats['success'] else 'failed'
+                f.write(f"| `{stats['query']}` | {status} | {fmt(stats['wall_s'])} | "
+                        f"{stats['triples']} |\n")
+            consumers = sum(1 for stats in run_stats if stats['reads_helpers'])
+            f.write(f"\n**Loaded into `<{HELPER_GRAPH}>` in:** {fmt(helper_report['load_s'])}s\n\n")
+            f.write(f"**Read by:** {consumers} quer{'y' if consumers == 1 else 'ies'}\n\n")
+            if helper_report['saved_s'] is None:
+                f.write("**Time saved vs previous run:** n/a (needs uncached runs, e.g. `--no-cache`)\n")
+            else:
+                f.write(f"**Time saved vs previous run:** {helper_report['saved_s']:.3f}s "
+                        "(helper stage plus the queries reading the helper graph)\n")
+    
+    return regressions
 
 
 def main():
     """Main execution flow."""
-    global SOURCE_FUSEKI_AVAILABLE, TARGET_FUSEKI_AVAILABLE
+    global SOURCE_FUSEKI_AVAILABLE, TARGET_FUSEKI_AVAILABLE, CACHE_ENABLED, INPUT_GRAPH_HASH
+    global PARTITIONING_ENABLED, HELPER_QUERIES_HASH, BULK_LOAD_ENABLED
+    global NAMED_GRAPHS_ENABLED, PREVIOUS_GRAPH_HASHES, RUN_HELPER_GRAPH
     
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description='Execute ERA CONSTRUCT queries')
     parser.add_argument('-y', '--yes', action='store_true', 
                         help='Skip confirmation prompt')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of CONSTRUCT queries to run concurrently (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-run every query instead of reusing cached results')
+    parser.add_argument('--cache-size-mb', type=int, default=CACHE_MAX_MB,
+                        help=f'Maximum size of the result cache in MB (default: {CACHE_MAX_MB})')
+    parser.add_argument('--no-partition', action='store_true',
+                        help='Run partitioned queries as a single query instead of in shards')
+    parser.add_argument('--bulk-load', action='store_true',
+                        help='Replace the target graph with the combined output in one '
+                             'transaction at the end, instead of inserting per query')
+    parser.add_argument('--gzip', action='store_true',
+                        help='Gzip-compress the --bulk-load upload')
+    parser.add_argument('--named-graphs', action='store_true',
+                        help='Load each query into its own named graph and only replace '
+                             'graphs whose result changed (also writes a TriG file)')
+    parser.add_argument('--reload-all', action='store_true',
+                        help='With --named-graphs, replace every graph even if unchanged')
+    parser.add_argument('--docker', action='store_true',
+                        help='Use an Oxigraph Docker container instead of the embedded '
+                             'pyoxigraph store when the source endpoint is unavailable')
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.gzip and not args.bulk_load:
+        parser.error('--gzip requires --bulk-load')
+    if args.named_graphs and args.bulk_load:
+        parser.error('--named-graphs cannot be combined with --bulk-load')
+    if args.reload_all and not args.named_graphs:
+        parser.error('--reload-all requires --named-graphs')
+    PARTITIONING_ENABLED = not args.no_partition
+    BULK_LOAD_ENABLED = args.bulk_load
+    NAMED_GRAPHS_ENABLED = args.named_graphs
     
     try:
         print("=" * 70)
@@ -317,6 +1186,7 @@ def main():
         print(f"Target endpoint: {TARGET_ENDPOINT}")
         print(f"Query directory: {CONSTRUCT_DIR}")
         print(f"Output TTL file: {OUTPUT_TTL_FILE}")
+        print(f"Concurrent jobs: {args.jobs}")
         print()
         
         # Check source endpoint availability
@@ -325,29 +1195,66 @@ def main():
         if SOURCE_FUSEKI_AVAILABLE:
             print("✓ Source endpoint is available (will query Fuseki)")
         else:
-            print("⚠️  Source endpoint not available (will use Oxigraph Docker)")
+            use_embedded = pyoxigraph is not None and not args.docker
+            if use_embedded:
+                print("⚠️  Source endpoint not available (will use embedded Oxigraph store)")
+            else:
+                print("⚠️  Source endpoint not available (will use Oxigraph Docker)")
             # Check if local file exists
             if not Path(INPUT_TTL_FILE).exists():
                 print(f"❌ ERROR: Local file not found: {INPUT_TTL_FILE}")
                 print("   Please run step 01-prep first")
                 return 1
             
-            # Start Oxigraph container
-            if not start_oxigraph_container():
-                print("❌ ERROR: Failed to start Oxigraph container")
-                print("   Please ensure Docker is running")
-                return 1
-            
-            # Load data into Oxigraph
-            if not load_data_to_oxigraph():
-                print("❌ ERROR: Failed to load data into Oxigraph")
-                return 1
+            if use_embedded:
+                # Load data into the in-process store
+                if not load_embedded_store():
+                    print("❌ ERROR: Failed to load data into embedded store")
+                    return 1
+            else:
+                # Start Oxigraph container
+                if not start_oxigraph_container():
+                    print("❌ ERROR: Failed to start Oxigraph container")
+                    print("   Please ensure Docker is running (or pip install pyoxigraph)")
+                    return 1
+                
+                # Load data into Oxigraph
+                if not load_data_to_oxigraph():
+                    print("❌ ERROR: Failed to load data into Oxigraph")
+                    return 1
+        
+        # The source dataset may be shared with other runs, so the helper graph
+        # written to a Fuseki source gets an IRI of its own (dropped in `finally`)
+        if SOURCE_FUSEKI_AVAILABLE:
+            RUN_HELPER_GRAPH = f"{HELPER_GRAPH}-{uuid.uuid4().hex}"
+        
+        # Enable the result cache (keyed on the data the source serves)
+        if args.no_cache:
+            print("Result cache disabled (--no-cache)")
+        elif SOURCE_FUSEKI_AVAILABLE:
+            # The endpoint's data may differ from the local input file
+            try:
+                INPUT_GRAPH_HASH = source_fingerprint()
+                CACHE_ENABLED = True
+                print(f"Result cache enabled ({CACHE_DIR}, source graph {INPUT_GRAPH_HASH[:12]})")
+            except Exception as e:
+                print(f"⚠️  Result cache disabled (cannot fingerprint the source graph: {e})")
+        elif Path(INPUT_TTL_FILE).exists():
+            INPUT_GRAPH_HASH = file_sha256(Path(INPUT_TTL_FILE))
+            CACHE_ENABLED = True
+            print(f"Result cache enabled ({CACHE_DIR}, input graph {INPUT_GRAPH_HASH[:12]})")
+        else:
+            print(f"⚠️  Result cache disabled (input graph {INPUT_TTL_FILE} not found)")
         
         # Check target endpoint availability
         print("Checking target endpoint availability...")
         TARGET_FUSEKI_AVAILABLE = check_fuseki_availability()
         if TARGET_FUSEKI_AVAILABLE:
             print("✓ Target endpoint is available (will save to Fuseki)")
+            if BULK_LOAD_ENABLED:
+                print(f"  Bulk load: one transaction after all queries{' (gzip)' if args.gzip else ''}")
+            if NAMED_GRAPHS_ENABLED:
+                print(f"  Named graphs: one graph per query under {QUERY_GRAPH_BASE}")
         else:
             print("⚠️  WARNING: Target endpoint is not available")
             print("   Results will only be saved to TTL file")
@@ -365,8 +1272,39 @@ def main():
             print(f"  - {f}")
         print()
         
-        # Clear target endpoint if available
-        if TARGET_FUSEKI_AVAILABLE:
+        # Resolve the `# depends-on:` headers of the queries
+        try:
+            dependencies = build_dependencies(query_files)
+            topological_order(query_files, dependencies)
+        except ValueError as e:
+            print(f"❌ ERROR: Invalid query dependencies: {e}")
+            return 1
+        for f, deps in dependencies.items():
+            if deps:
+                print(f"  {f.name} depends on: {', '.join(d.name for d in deps)}")
+        
+        # With named graphs, only the graphs the previous run loaded are known to be current
+        if TARGET_FUSEKI_AVAILABLE and NAMED_GRAPHS_ENABLED:
+            if not args.reload_all:
+                PREVIOUS_GRAPH_HASHES = {
+                    row['graph']: row['sha256']
+                    for row in load_previous_report().get('queries', [])
+                    if row.get('graph') and row.get('sha256')
+                }
+            stale_graphs = set(PREVIOUS_GRAPH_HASHES) - {query_graph_iri(f) for f in query_files}
+            try:
+                # The default graph holds what step 03 added to the previous output (or the
+                # output of a default-graph run); step 03 re-creates it from the new graphs
+                print("\n🗑️  Clearing target default graph...")
+                clear_target_endpoint()
+                for graph_iri in sorted(stale_graphs):
+                    drop_named_graph(graph_iri)
+                    print(f"🗑️  Dropped graph of removed query <{graph_iri}>")
+            except Exception as e:
+                print(f"⚠️  WARNING: Failed to clean up target endpoint: {e}")
+        
+        # Clear target endpoint if available (a bulk load replaces the graph instead)
+        elif TARGET_FUSEKI_AVAILABLE and not BULK_LOAD_ENABLED:
             print("\n🗑️  Clearing target endpoint...")
             try:
                 clear_target_endpoint()
@@ -375,27 +1313,83 @@ def main():
                 print("   Continuing with local file output only")
                 TARGET_FUSEKI_AVAILABLE = False
         
-        # Initialize combined TTL output
-        combined_turtle = ""
+        run_start = time.perf_counter()
         
-        # Process each query file
+        # Materialize the helper graph the mapping queries share
+        helper_report = {'queries': [], 'load_s': None, 'saved_s': None}
+        helper_files = find_helper_queries()
+        if helper_files:
+            print(f"\n🧩 Materializing helper graph from {len(helper_files)} helper quer"
+                  f"{'y' if len(helper_files) == 1 else 'ies'}...")
+            HELPER_QUERIES_HASH = hashlib.sha256(
+                b''.join(f.read_bytes() for f in helper_files)).hexdigest()
+            with tempfile.TemporaryDirectory() as work_dir:
+                success, helper_report = materialize_helpers(helper_files, Path(work_dir))
+            if not success:
+                print("❌ ERROR: Failed to materialize the helper graph")
+                return 1
+        
+        # Stream each query's result into the output file, in file order.
+        # Results are spooled per query so failed queries contribute nothing.
+        print(f"\n💾 Streaming combined results to {OUTPUT_TTL_FILE}...")
         results = []
-        for query_file in query_files:
-            success, message, turtle_data = process_query_file(query_file)
-            results.append((query_file, success, message))
-            if success:
-                combined_turtle += "\n" + turtle_data
-        
-        # Save combined TTL file
-        print(f"\n💾 Saving combined results to {OUTPUT_TTL_FILE}...")
+        run_stats = []
         try:
-            with open(OUTPUT_TTL_FILE, 'w', encoding='utf-8') as f:
-                f.write(combined_turtle)
+            output_path = Path(OUTPUT_TTL_FILE)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            # N-Triples lines are valid inside a TriG graph block, so each result is
+            # copied verbatim into `<graph> { ... }`
+            trig_path = Path(OUTPUT_TRIG_FILE) if NAMED_GRAPHS_ENABLED else Path(os.devnull)
+            with open(output_path, 'wb') as output, open(trig_path, 'wb') as trig, \
+                    tempfile.TemporaryDirectory(dir=output_path.parent) as part_dir:
+                for query_file, success, message, part_file, stats in process_query_files(
+                        query_files, dependencies, Path(part_dir), args.jobs):
+                    results.append((query_file, success, message))
+                    run_stats.append(stats)
+                    if success:
+                        with open(part_file, 'rb') as part:
+                            shutil.copyfileobj(part, output, STREAM_CHUNK_SIZE)
+                        if NAMED_GRAPHS_ENABLED:
+                            trig.write(f"<{query_graph_iri(query_file)}> {{\n".encode('utf-8'))
+                            with open(part_file, 'rb') as part:
+                                shutil.copyfileobj(part, trig, STREAM_CHUNK_SIZE)
+                            trig.write(b"}\n\n")
+                    part_file.unlink(missing_ok=True)
             print(f"✓ Saved to {OUTPUT_TTL_FILE}")
-        except Exception as e:
+            if NAMED_GRAPHS_ENABLED:
+                print(f"✓ Saved to {OUTPUT_TRIG_FILE}")
+        except OSError as e:
             print(f"❌ Failed to save TTL file: {e}")
             return 1
         
+        # Replace the target graph with the complete output in one transaction.
+        # If any query failed, the target keeps its previous, complete graph.
+        if TARGET_FUSEKI_AVAILABLE and BULK_LOAD_ENABLED:
+            failed_queries = sum(1 for _, success, _ in results if not success)
+            if failed_queries:
+                print(f"⚠️  Skipping bulk load: {failed_queries} quer{'y' if failed_queries == 1 else 'ies'} "
+                      "failed (target endpoint left unchanged)")
+                TARGET_FUSEKI_AVAILABLE = False
+            else:
+                print(f"\n📤 Bulk loading {OUTPUT_TTL_FILE} into target endpoint...")
+                load_start = time.perf_counter()
+                try:
+                    replace_target_graph(output_path, compress=args.gzip)
+                    print(f"✓ Replaced target graph in {time.perf_counter() - load_start:.2f}s")
+                except Exception as e:
+                    print(f"⚠️  WARNING: Bulk load failed, target endpoint left unchanged: {e}")
+                    TARGET_FUSEKI_AVAILABLE = False
+        
+        if CACHE_ENABLED:
+            evicted = evict_cache(args.cache_size_mb * 1024 * 1024)
+            if evicted:
+                print(f"🧹 Evicted {evicted} least recently used cache entr{'y' if evicted == 1 else 'ies'}")
+        
+        # Write the per-query performance report
+        regressions = write_run_report(run_stats, time.perf_counter() - run_start, args.jobs,
+                                       helper_report)
+        print(f"📊 Performance report saved to {REPORT_JSON_FILE} and {REPORT_MD_FILE}")
+        
         # Summary
         print("\n" + "=" * 70)
         print("SUMMARY")
@@ -409,7 +1403,18 @@ def main():
         print(f"❌ Failed: {failed}")
         if TARGET_FUSEKI_AVAILABLE:
             print(f"💾 Saved to Fuseki: {TARGET_ENDPOINT}")
+            if NAMED_GRAPHS_ENABLED:
+                unchanged = sum(1 for stats in run_stats if stats['graph_unchanged'])
+                replaced = sum(1 for stats in run_stats if stats['graph']) - unchanged
+                print(f"   Named graphs: {replaced} replaced, {unchanged} unchanged")
         print(f"💾 Saved to file: {OUTPUT_TTL_FILE}")
+        if helper_report['saved_s'] is not None:
+            print(f"⏱️  Helper graph saved {helper_report['saved_s']:.2f}s compared to the previous run")
+        
+        if regressions:
+            print("\n⚠️  Regressions compared to the previous run:")
+            for stats in regressions:
+                print(f"  - {stats['query']}: {'; '.join(stats['regressions'])}")
         
         if failed > 0:
             print("\nFailed queries:")
@@ -423,6 +1428,13 @@ def main():
             return 0
     
     finally:
+        # Leave the source dataset as it was
+        if SOURCE_FUSEKI_AVAILABLE and RUN_HELPER_GRAPH != HELPER_GRAPH:
+            try:
+                drop_helper_graph()
+            except Exception as e:
+                print(f"⚠️  Warning: Failed to remove <{RUN_HELPER_GRAPH}> from the source: {e}")
+        
         # Always clean up Oxigraph container if it was started
         stop_oxigraph_container()
 
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Benchmark geometry enrichment on synthetic ERA graphs.
+
+For every size (number of network references) a synthetic graph is written
+as N-Triples, then enriched by enrich-geometries.py in a fresh process so
+that the peak memory of each size is measured on its own. Every phase is
+timed and the peak resident memory after it is recorded:
+
+    load, index, lists, enrich_points, enrich_lines, enrich_areas, enrich_subjects
+    (the tables backend runs the four enrich phases as one "enrich_tables")
+
+Results are merged into enrichment-benchmark.json next to this script
+(one entry per backend and size, the previous value is shown for
+comparison), which is tracked so changes can be compared over time.
+
+The synthetic network mirrors the advanced example: tracks are chains of
+LinearElements with 2-30 vertex LINESTRINGs; every NetLinearReference has
+its own start and end NetPointReferences and a sequence of mostly one
+element; other NetPointReferences stand alone; NetAreaReferences include
+a few linear references; subjects carry one or more era:netReference.
+
+Usage:
+    python benchmark-enrichment.py
+    python benchmark-enrichment.py --sizes 1000 10000 --backend tables
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# Configuration
+BENCHMARK_DIR = Path(__file__).resolve().parent
+ENRICH_SCRIPT = BENCHMARK_DIR.parent / "enrich-geometries.py"
+RESULTS_FILE = BENCHMARK_DIR / "enrichment-benchmark.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DEFAULT_TIMEOUT = 3 * 3600  # seconds per size
+SEED = 949
+GENERATE_BATCH = 100_000  # triples buffered before writing
+
+# Share of the references per kind (from the advanced example)
+LINEAR_SHARE = 0.27  # each also adds a start and an end NetPointReference
+AREA_SHARE = 0.03
+ELEMENTS_PER_TRACK = 20
+REFERENCES_PER_ELEMENT = 5
+
+BASE = "https://data.matdata.eu/bench"
+ERA = "http://data.europa.eu/949/"
+GSP = "http://www.opengis.net/ont/geosparql#"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+# ---------------------------------------------------------------------------
+# Synthetic graph
+# ---------------------------------------------------------------------------
+
+def generate_graph(references: int, path: Path, seed: int = SEED) -> Dict[str, int]:
+    """
+    Write a synthetic ERA graph with about `references` network references.
+
+    Returns:
+        Counts of the generated resources and triples
+    """
+    rng = random.Random(seed)
+    counts = {"linear_elements": 0, "point_references": 0, "linear_references": 0,
+              "area_references": 0, "subjects": 0, "triples": 0}
+    out = open(path, "w", encoding="utf-8", newline="\n")
+    lines: List[str] = []
+
+    def triple(s: str, p: str, o: str):
+        lines.append(f"<{s}> <{p}> {o} .\n")
+        if len(lines) >= GENERATE_BATCH:
+            flush()
+
+    def flush():
+        out.writelines(lines)
+        counts["triples"] += len(lines)
+        lines.clear()
+
+    def list_nodes(prefix: str, items: List[str]) -> str:
+        """Write an RDF list and return its head."""
+        nodes = [f"{prefix}_{i + 1}" for i in range(len(items))]
+        for i, (node, item) in enumerate(zip(nodes, items)):
+            triple(node, f"{RDF}first", f"<{item}>")
+            rest = f"<{nodes[i + 1]}>" if i + 1 < len(nodes) else f"<{RDF}nil>"
+            triple(node, f"{RDF}rest", rest)
+        return nodes[0]
+
+    def point_reference(name: str, element: str, offset: float) -> str:
+        ref, tc = f"{BASE}/_netPointReferences_{name}", f"{BASE}/_topologicalCoordinates_{name}"
+        triple(ref, f"{RDF}type", f"<{ERA}NetPointReference>")
+        triple(ref, f"{ERA}hasTopoCoordinate", f"<{tc}>")
+        triple(tc, f"{RDF}type", f"<{ERA}TopologicalCoordinate>")
+        triple(tc, f"{ERA}onLinearElement", f"<{element}>")
+        triple(tc, f"{ERA}offsetFromOrigin", f'"{offset:.0f}"^^<{XSD}integer>')
+        counts["point_references"] += 1
+        return ref
+
+    # Network: tracks of consecutive LinearElements
+    n_elements = max(ELEMENTS_PER_TRACK, references // REFERENCES_PER_ELEMENT)
+    tracks: List[List[str]] = []
+    lengths: Dict[str, float] = {}
+    for t in range(math.ceil(n_elements / ELEMENTS_PER_TRACK)):
+        x, y = rng.uniform(3.3, 7.0), rng.uniform(50.8, 53.4)
+        heading = rng.uniform(0, 2 * math.pi)
+        track = []
+        for e in range(ELEMENTS_PER_TRACK):
+            name = f"ne_{t}_{e}"
+            element, geometry = f"{BASE}/_netElements_{name}", f"{BASE}/_geometry_netElement_{name}"
+            coords = [(x, y)]
+            for _ in range(min(29, 1 + int(rng.expovariate(1 / 3)))):
+                heading += rng.gauss(0, 0.2)
+                step = rng.uniform(0.0005, 0.004)
+                x, y = x + step * math.cos(heading), y + step * math.sin(heading)
+                coords.append((x, y))
+            length = sum(math.dist(a, b) for a, b in zip(coords, coords[1:])) * 111_000
+            wkt = "LINESTRING(" + ", ".join(f"{cx:.6f} {cy:.6f}" for cx, cy in coords) + ")"
+            triple(element, f"{RDF}type", f"<{ERA}LinearElement>")
+            triple(element, f"{ERA}lengthOfNetLinearElement", f'"{length:.0f}"^^<{XSD}double>')
+            triple(element, f"{GSP}hasGeometry", f"<{geometry}>")
+            triple(geometry, f"{GSP}asWKT", f'"{wkt}"^^<{GSP}wktLiteral>')
+            lengths[element] = round(length)
+            track.append(element)
+        tracks.append(track)
+    counts["linear_elements"] = sum(len(track) for track in tracks)
+
+    def add_subject(kind: str, name: str, refs: List[str]):
+        subject = f"{BASE}/_{kind}_{name}"
+        for ref in refs:
+            triple(subject, f"{ERA}netReference", f"<{ref}>")
+        counts["subjects"] += 1
+
+    # NetLinearReferences with start/end NetPointReferences (one track subject each)
+    n_linear = max(1, int(references * LINEAR_SHARE))
+    n_area = max(1, int(references * AREA_SHARE))
+    n_point = max(1, references - 3 * n_linear - n_area)
+    linear_refs = []
+    for i in range(n_linear):
+        track = rng.choice(tracks)
+        size = 1 if rng.random() < 0.85 else rng.choice([2, 2, 3, 3, 4, 5, 8])
+        first = rng.randrange(len(track) - size + 1)
+        elements = track[first:first + size]
+        start = rng.uniform(0, lengths[elements[0]])
+        end = rng.uniform(0, lengths[elements[-1]])
+        if size == 1 and start > end and rng.random() < 0.9:
+            start, end = end, start
+        name = f"trc{i}"
+        ref = f"{BASE}/_netLinearReferences_{name}"
+        triple(ref, f"{RDF}type", f"<{ERA}NetLinearReference>")
+        triple(ref, f"{ERA}startsAt", f"<{point_reference(name + '_start', elements[0], start)}>")
+        triple(ref, f"{ERA}endsAt", f"<{point_reference(name + '_end', elements[-1], end)}>")
+        triple(ref, f"{ERA}hasSequence", f"<{list_nodes(ref, elements)}>")
+        counts["linear_references"] += 1
+        linear_refs.append(ref)
+        add_subject("tracks", name, [ref])
+
+    # Standalone NetPointReferences (signals, switches...), sometimes several per subject
+    pending = []
+    for i in range(n_point):
+        element = rng.choice(rng.choice(tracks))
+        pending.append(point_reference(f"sig{i}", element, rng.uniform(0, lengths[element])))
+        if rng.random() < 0.9 or len(pending) == 5:
+            add_subject("signals", str(i), pending)
+            pending = []
+    if pending:
+        add_subject("signals", "last", pending)
+
+    # NetAreaReferences including a few linear references
+    for i in range(n_area):
+        size = 1 if rng.random() < 0.6 else rng.choice([2, 3, 6, 16, 17])
+        ref = f"{BASE}/_netAreaReferences_area{i}"
+        triple(ref, f"{RDF}type", f"<{ERA}NetAreaReference>")
+        included = rng.sample(linear_refs, min(size, len(linear_refs)))
+        triple(ref, f"{ERA}includes", f"<{list_nodes(ref + '_includes', included)}>")
+        counts["area_references"] += 1
+        add_subject("tunnels", str(i), [ref])
+
+    flush()
+    out.close()
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Measurement (runs in a child process per size)
+# ---------------------------------------------------------------------------
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB (None if it cannot be read)."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes on Linux
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage",
+                    "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 2**20
+    except Exception:
+        return None
+
+
+def measure(backend: str, graph_file: str) -> Dict[str, Dict[str, float]]:
+    """
+    Enrich `graph_file` phase by phase with the given backend.
+
+    Returns:
+        Per phase: seconds, peak RSS in MB after the phase and geometries added
+    """
+    spec = importlib.util.spec_from_file_location("enrich_geometries", ENRICH_SCRIPT)
+    sys.path.insert(0, str(ENRICH_SCRIPT.parent))
+    enrich = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(enrich)
+
+    phases: Dict[str, Dict[str, float]] = {}
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        phases[name] = {"s": round(time.perf_counter() - start, 3), "peak_rss_mb": peak_rss_mb()}
+        if isinstance(result, int):
+            phases[name]["geometries"] = result
+        return result
+
+    if backend == "tables":
+        table = timed("load", lambda: enrich.load_triple_table(
+            path=graph_file, format=enrich.pyoxigraph.RdfFormat.N_TRIPLES))
+        le_index, le_lengths = timed("index", enrich.build_table_le_index, table)
+        lists = timed("lists", enrich.decode_table_lists, table)
+        _, counts = timed("enrich_tables", enrich.enrich_tables, table, le_index, le_lengths, lists)
+        phases["enrich_tables"]["geometries"] = sum(counts)
+        return phases
+
+    graph = enrich.Graph()
+    timed("load", lambda: graph.parse(graph_file, format="nt"))
+    new_triples = enrich.Graph()
+    le_index = timed("index", enrich.build_le_index, graph)
+    lists = timed("lists", enrich.decode_graph_lists, graph)
+    timed("enrich_points", enrich.enrich_points, graph, new_triples, le_index)
+    timed("enrich_lines", enrich.enrich_lines, graph, new_triples, le_index, lists)
+    timed("enrich_areas", enrich.enrich_areas, graph, new_triples, lists)
+    n, _ = timed("enrich_subjects", enrich.enrich_subjects, graph, new_triples)
+    phases["enrich_subjects"]["geometries"] = n
+    return phases
+
+
+def run_size(backend: str, references: int, work_dir: Path, timeout: int) -> Dict:
+    """Generate a graph of the given size and measure it in a fresh process."""
+    graph_file = work_dir / f"synthetic-{references}.nt"
+    start = time.perf_counter()
+    counts = generate_graph(references, graph_file)
+    print(f"  Generated {counts['triples']} triples in {time.perf_counter() - start:.1f}s "
+          f"({counts['linear_elements']} LinearElements)")
+
+    entry = {"backend": backend, "references": references, **counts,
+             "measured": datetime.now().isoformat(timespec="seconds")}
+    try:
+        child = subprocess.run(
+            [sys.executable, __file__, "--measure", backend, str(graph_file)],
+            capture_output=True, text=True, timeout=timeout, encoding="utf-8")
+        if child.returncode != 0:
+            last_line = (child.stderr.strip().splitlines() or [f"exit code {child.returncode}"])[-1]
+            entry["status"] = f"failed: {last_line}"
+        else:
+            entry["status"] = "ok"
+            entry["phases"] = json.loads(child.stdout.strip().splitlines()[-1])
+    except subprocess.TimeoutExpired:
+        entry["status"] = f"failed: timeout after {timeout}s"
+    finally:
+        graph_file.unlink(missing_ok=True)
+    return entry
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def load_results() -> Dict:
+    """Load the tracked results (empty if there are none yet)."""
+    try:
+        with open(RESULTS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"runs": []}
+
+
+def print_entry(entry: Dict, previous: Optional[Dict]):
+    """Print the phases of a run next to the previous result of the same size."""
+    if entry["status"] != "ok":
+        print(f"  ❌ {entry['status']}")
+        return
+    previous_phases = (previous or {}).get("phases", {})
+    total = 0.0
+    for name, phase in entry["phases"].items():
+        total += phase["s"]
+        before = previous_phases.get(name)
+        compare = f" (was {before['s']:.2f}s)" if before else ""
+        memory = f", peak {phase['peak_rss_mb']:.0f} MB" if phase.get("peak_rss_mb") else ""
+        print(f"    {name:<16} {phase['s']:>9.2f}s{compare}{memory}")
+    print(f"  ✓ Total {total:.2f}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark geometry enrichment on synthetic ERA graphs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Numbers of network references to benchmark (default: 1k 10k 100k 1M)")
+    parser.add_argument("--backend", choices=["rdflib", "tables"], default="rdflib",
+                        help="enrich-geometries.py backend to measure (default: rdflib)")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT,
+                        help="Seconds allowed per size before it is recorded as failed")
+    parser.add_argument("--measure", nargs=2, metavar=("BACKEND", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        # Child process: print the phase measurements as the last line
+        print(json.dumps(measure(*args.measure)))
+        return 0
+
+    results = load_results()
+    runs = {(run["backend"], run["references"]): run for run in results.get("runs", [])}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for references in sorted(args.sizes):
+            print(f"\n📊 {args.backend} backend, {references} references")
+            entry = run_size(args.backend, references, Path(work_dir), args.timeout)
+            print_entry(entry, runs.get((args.backend, references)))
+            runs[(args.backend, references)] = entry
+            if entry["status"] != "ok":
+                print("  Larger sizes skipped")
+                break
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": sorted(runs.values(), key=lambda run: (run["backend"], run["references"])),
+    }
+    with open(RESULTS_FILE, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"\n✓ Results saved to {RESULTS_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,32 +6,146 @@ Computes GeoSPARQL geometries for:
 - NetLinearReference -> LINESTRING (concatenated from sequence of LinearElements)
 - NetAreaReference   -> MULTILINESTRING (combined from included NetLinearReferences)
 - Subjects of era:netReference -> combined WKT from all referenced geometries
+
+With --targeted, only the triples the enrichment reads are extracted from
+Fuseki (see ENRICHMENT_INPUT_QUERY) instead of the whole graph, straight
+into the triple tables of the tables backend.
+
+With --workers N, the geometries of each phase are computed in chunks on a
+process pool. The graph is only read and written in the main process, and
+results are added in the same order as a serial run, so the output is
+identical.
+
+With --simplify M [M ...], every new subject geometry also gets simplified
+levels of detail, one per resolution M in meters (see simplify_levels()).
+They are separate gsp:Geometry nodes linked with SIMPLIFIED_GEOMETRY and
+tagged with gsp:hasMetricSpatialResolution; gsp:hasGeometry keeps pointing
+to the full geometry only.
 """
 
+import argparse
 import hashlib
 import os
-
+import re
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
 import requests
-from rdflib import Graph, Namespace, URIRef, Literal, RDF
+import shapely
+from rdflib import Graph, Namespace, URIRef, Literal, RDF, XSD
 from shapely import wkt as shapely_wkt
 from shapely.geometry import GeometryCollection, LineString, MultiLineString, MultiPoint, Point
-from shapely.ops import substring
+
+import rdf_convert
+from rdf_lists import RdfLists, decode_graph_lists, decode_lists, list_items
+
+# Optional: triple-table backend (--backend tables)
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
 
 # Namespaces
 ERA = Namespace("http://data.europa.eu/949/")
 GSP = Namespace("http://www.opengis.net/ont/geosparql#")
 
+# Links a feature to a simplified level of detail of its geometry (a
+# separate property, as the shapes allow one gsp:hasGeometry per feature)
+SIMPLIFIED_GEOMETRY = URIRef("https://data.matdata.eu/def#hasSimplifiedGeometry")
+
 # Configuration
 FUSEKI_URL = "http://localhost:8082/jena-fuseki/advanced-example"
 FUSEKI_QUERY = f"{FUSEKI_URL}/query"
 FUSEKI_DATA = f"{FUSEKI_URL}/data"
 INPUT_TTL = "../02-construct/output/era-graph.ttl"
 OUTPUT_TTL = "output/era-graph-enriched.ttl"
+OUTPUT_NT = "output/era-graph-enriched.nt"
+# N-Triples form of INPUT_TTL for --append-only, when the input is not N-Triples itself
+INPUT_NT_CACHE = "output/era-graph-input.nt"
+COPY_CHUNK_SIZE = 1 << 20
+
+# One N-Triples statement, blank line or comment
+NTRIPLES_LINE = re.compile(
+    rb'\s*(?:(?:<[^>]*>|_:\S+)\s*<[^>]*>\s*'
+    rb'(?:<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:\^\^<[^>]*>|@[A-Za-z0-9-]+)?)\s*\.)?\s*(?:#.*)?'
+)
+
+# Decimals of the coordinates in new WKT literals (set by --wkt-precision;
+# None keeps full double precision, 7 decimals is ~1 cm in WGS84 degrees)
+WKT_PRECISION: Optional[int] = None
+
+# Geometry nodes written so far, by (type, WKT), shared by all enrich phases
+# so that identical geometries are hashed and written once
+GEOMETRY_STORE: Dict[Tuple[str, str], URIRef] = {}
+
+# Resolutions in meters of the simplified subject geometries (set by
+# --simplify, ascending), and the meters per degree used to turn them into
+# WGS84 tolerances (a degree of latitude; a degree of longitude is shorter,
+# so the simplification error stays below the resolution)
+SIMPLIFY_RESOLUTIONS: List[float] = []
+METERS_PER_DEGREE = 111_320.0
+
+# Process pool for the geometry computations (set by --workers)
+PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+WORKERS = 1
+CHUNKS_PER_WORKER = 4
+
+# Triples read by the enrich phases, as one result set (see fetch_enrichment_table())
+ENRICHMENT_INPUT_QUERY = """
+PREFIX era: <http://data.europa.eu/949/>
+PREFIX gsp: <http://www.opengis.net/ont/geosparql#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT DISTINCT ?s ?p ?o WHERE {
+  {
+    # Reference types
+    VALUES ?o { era:NetPointReference era:NetLinearReference era:NetAreaReference }
+    ?s rdf:type ?o .
+    BIND(rdf:type AS ?p)
+  } UNION {
+    # Element lengths, topological coordinates, sequences and geometry links
+    VALUES ?p {
+      era:lengthOfNetLinearElement era:hasTopoCoordinate era:onLinearElement era:offsetFromOrigin
+      era:startsAt era:endsAt era:hasSequence era:includes era:netReference gsp:hasGeometry
+    }
+    ?s ?p ?o .
+  } UNION {
+    # WKT of element and reference geometries; other geometries are only
+    # checked for existence
+    ?located gsp:hasGeometry ?s .
+    FILTER EXISTS {
+      { ?located era:lengthOfNetLinearElement [] }
+      UNION { [] era:netReference ?located }
+      UNION { [] era:includes/rdf:rest*/rdf:first ?located }
+    }
+    ?s gsp:asWKT ?o .
+    BIND(gsp:asWKT AS ?p)
+  } UNION {
+    # RDF lists of sequences and included references
+    [] era:hasSequence|era:includes ?head .
+    ?head rdf:rest* ?s .
+    VALUES ?p { rdf:first rdf:rest }
+    ?s ?p ?o .
+  }
+}
+"""
 
 
 def geometry_uri(geom_type: str, wkt_str: str) -> URIRef:
-    """Create a deterministic geometry URI from type and WKT."""
-    h = hashlib.sha256(wkt_str.encode()).hexdigest()[:8]
+    """Create a deterministic geometry URI from type and WKT.
+
+    The full SHA-256 is used: with a truncated hash, two different WKTs
+    could share one URI, which would then get both asWKT literals.
+    """
+    h = hashlib.sha256(wkt_str.encode()).hexdigest()
     return URIRef(f"https://data.matdata.eu/_geometry_{geom_type}_{h}")
 
 
@@ -43,53 +157,210 @@ def parse_wkt(wkt_str: str):
     return shapely_wkt.loads(s)
 
 
-def add_geometry(graph: Graph, new_triples: Graph, subject: URIRef, geom_type: str, wkt_str: str):
-    """Add gsp:hasGeometry triples to both the main graph and the new-triples graph."""
-    uri = geometry_uri(geom_type, wkt_str)
-    wkt_lit = Literal(wkt_str, datatype=GSP.wktLiteral)
-    for g in (graph, new_triples):
-        g.add((subject, GSP.hasGeometry, uri))
-        g.add((uri, RDF.type, GSP.Geometry))
-        g.add((uri, GSP.asWKT, wkt_lit))
+def format_wkt(geoms, precision: Optional[int] = None):
+    """WKT of a geometry (or array of geometries) with `precision` decimals.
 
+    Without a precision this is the same as the .wkt property.
+    """
+    return shapely.to_wkt(geoms, rounding_precision=-1 if precision is None else precision)
 
-def get_le_geometry(graph: Graph, le: URIRef):
-    """Return a LinearElement's (Shapely geometry, length_in_meters) or (None, None)."""
-    length = None
-    for o in graph.objects(le, ERA.lengthOfNetLinearElement):
-        length = float(o)
-        break
 
-    geom = None
-    for g in graph.objects(le, GSP.hasGeometry):
-        for w in graph.objects(g, GSP.asWKT):
-            geom = parse_wkt(w)
-            break
-        if geom:
-            break
+def store_geometry(geom_type: str, wkt_str: str) -> Tuple[URIRef, bool]:
+    """Return the node of a geometry and whether it is new to GEOMETRY_STORE."""
+    key = (geom_type, wkt_str)
+    uri = GEOMETRY_STORE.get(key)
+    if uri is not None:
+        return uri, False
+    uri = GEOMETRY_STORE[key] = geometry_uri(geom_type, wkt_str)
+    return uri, True
 
-    return geom, length
 
+def add_geometry(graph: Graph, new_triples: Graph, subject: URIRef, geom_type: str, wkt_str: str):
+    """Add gsp:hasGeometry triples to both the main graph and the new-triples graph.
 
-def rdf_list_items(graph: Graph, head) -> list:
-    """Traverse an RDF list and return all items in order."""
-    items = []
-    node = head
-    while node and node != RDF.nil:
-        first = next(graph.objects(node, RDF.first), None)
-        if first is not None:
-            items.append(first)
-        node = next(graph.objects(node, RDF.rest), None)
-    return items
+    The gsp:Geometry node itself is only added the first time a geometry
+    is stored (see store_geometry()).
+    """
+    uri, new = store_geometry(geom_type, wkt_str)
+    wkt_lit = Literal(wkt_str, datatype=GSP.wktLiteral)
+    for g in (graph, new_triples):
+        g.add((subject, GSP.hasGeometry, uri))
+        if new:
+            g.add((uri, RDF.type, GSP.Geometry))
+            g.add((uri, GSP.asWKT, wkt_lit))
+
+
+class LinearElementGeometry(NamedTuple):
+    """Parsed geometry of a LinearElement, as stored in the LinearElement index."""
+    geom: LineString
+    length: float  # era:lengthOfNetLinearElement, in meters
+    coords: np.ndarray  # (n, 2) vertex coordinates of geom
+    cumulative: np.ndarray  # distance along geom at each vertex, in CRS units
+
+
+def build_le_index(graph: Graph) -> Dict[URIRef, LinearElementGeometry]:
+    """Index the parsed geometry of every LinearElement with a geometry and a length.
+
+    Built once before enrichment: the enrich phases only add geometries to
+    references, never to LinearElements, so the index stays valid and every
+    lookup is a dict access instead of graph scans plus a WKT parse.
+    Elements without a geometry or with a zero length are left out, as no
+    reference can be located on them.
+    """
+    index = {}
+    for le, length_lit in graph.subject_objects(ERA.lengthOfNetLinearElement):
+        if le in index:
+            continue
+        length = float(length_lit)
+        if not length:
+            continue
+
+        geom = None
+        for g in graph.objects(le, GSP.hasGeometry):
+            for w in graph.objects(g, GSP.asWKT):
+                geom = parse_wkt(w)
+                break
+            if geom:
+                break
+        if not geom:
+            continue
+
+        coords = shapely.get_coordinates(geom)
+        # Accumulated like shapely.ops.substring() does, so batch_substrings()
+        # selects exactly the same vertices
+        dx, dy = np.diff(coords, axis=0).T
+        cumulative = np.concatenate(([0.0], np.cumsum(np.power(dx * dx + dy * dy, 0.5))))
+        index[le] = LinearElementGeometry(geom, length, coords, cumulative)
+
+    return index
+
+
+def batch_substrings(windows: List[Tuple[LinearElementGeometry, float, float]]) -> List[Optional[np.ndarray]]:
+    """Cut (element, start, end) windows out of their LinearElements in one batch.
+
+    Start and end are fractions of the element in [0, 1]. The result matches
+    shapely.ops.substring(geom, start, end, normalized=True) vertex for
+    vertex, including reversed windows (start > end), but all window ends
+    are interpolated with a single Shapely array call and the vertices in
+    between are found by one binary search per element on its cumulative
+    distances.
+
+    Returns:
+        The coordinate array of each window, or None where start == end
+        (substring() would return a point)
+    """
+    if not windows:
+        return []
+    entries, starts, ends = zip(*windows)
+    geoms = np.array([entry.geom for entry in entries], dtype=object)
+    lengths = shapely.length(geoms)
+    start_dists = np.asarray(starts) * lengths
+    end_dists = np.asarray(ends) * lengths
+    start_points = shapely.get_coordinates(shapely.line_interpolate_point(geoms, start_dists))
+    end_points = shapely.get_coordinates(shapely.line_interpolate_point(geoms, end_dists))
+
+    # Vertices strictly inside each window (the last vertex never is),
+    # searched for all windows of the same element at once
+    lows = np.minimum(start_dists, end_dists)
+    highs = np.maximum(start_dists, end_dists)
+    firsts = np.empty(len(windows), dtype=np.intp)
+    lasts = np.empty(len(windows), dtype=np.intp)
+    by_element = {}
+    for i, entry in enumerate(entries):
+        by_element.setdefault(id(entry), (entry, []))[1].append(i)
+    for entry, indices in by_element.values():
+        inner_cumulative = entry.cumulative[:-1]
+        firsts[indices] = np.searchsorted(inner_cumulative, lows[indices], side="right")
+        lasts[indices] = np.searchsorted(inner_cumulative, highs[indices], side="left")
+
+    result = []
+    for i, entry in enumerate(entries):
+        if starts[i] == ends[i]:
+            result.append(None)
+            continue
+        inner = entry.coords[firsts[i]:lasts[i]]
+        if start_dists[i] > end_dists[i]:
+            inner = inner[::-1]
+        coords = np.empty((len(inner) + 2, 2))
+        coords[0] = start_points[i]
+        coords[1:-1] = inner
+        coords[-1] = end_points[i]
+        result.append(coords)
+    return result
+
+
+def compute_in_chunks(func: Callable, items: list,
+                      elements: Optional[Dict[Hashable, LinearElementGeometry]] = None,
+                      element_keys: Optional[Callable] = None) -> list:
+    """Compute func(items[, elements], precision=WKT_PRECISION) in chunks on PROCESS_POOL.
+
+    Without a pool everything is computed at once. Otherwise the items are
+    split into WORKERS * CHUNKS_PER_WORKER chunks; each chunk carries only
+    the element geometries its items refer to (element_keys(item) gives
+    their keys), never graph objects. Results are concatenated in item
+    order, so the caller adds them to the graph exactly as a serial run.
+
+    Args:
+        func: Module-level function mapping a list of items to a list of results
+        items: Plain Python/numpy inputs, one per result
+        elements: LinearElement geometries, keyed as the items refer to them
+            (IRI strings or term ids, so no graph objects are shipped)
+        element_keys: Gives the element keys an item refers to
+
+    Returns:
+        One result per item, in item order
+    """
+    if not items:
+        return []
+    args = () if elements is None else (elements,)
+    if PROCESS_POOL is None:
+        return func(items, *args, precision=WKT_PRECISION)
+
+    size = -(-len(items) // (WORKERS * CHUNKS_PER_WORKER))
+    futures = []
+    for start in range(0, len(items), size):
+        chunk = items[start:start + size]
+        if elements is not None:
+            keys = {key for item in chunk for key in element_keys(item)}
+            args = ({key: elements[key] for key in keys},)
+        futures.append(PROCESS_POOL.submit(func, chunk, *args, precision=WKT_PRECISION))
+    return [result for future in futures for result in future.result()]
+
+
+def report_lists(lists: RdfLists):
+    """Print how many RDF lists were decoded and how many are malformed."""
+    print(f"  Decoded {len(lists.items)} RDF lists")
+    problems = {}
+    for issue in lists.issues:
+        problems[issue.problem] = problems.get(issue.problem, 0) + 1
+    if problems:
+        summary = ", ".join(f"{n} {problem}" for problem, n in problems.items())
+        print(f"  ⚠️  Malformed RDF lists: {summary} (items up to the problem are used, "
+              "see rdf_lists.py)")
 
 
 # ---------------------------------------------------------------------------
 # NetPointReference -> POINT
 # ---------------------------------------------------------------------------
 
-def enrich_points(graph: Graph, new_triples: Graph) -> int:
-    """Interpolate POINT geometries for NetPointReferences without geometry."""
-    count = 0
+def interpolate_points(items: List[Tuple[Hashable, float]],
+                       elements: Dict[Hashable, LinearElementGeometry],
+                       precision: Optional[int] = None) -> List[str]:
+    """Interpolate (element, fraction) items to POINT WKT with one Shapely array call."""
+    geoms = np.array([elements[key].geom for key, _ in items], dtype=object)
+    fracs = np.array([frac for _, frac in items])
+    points = shapely.line_interpolate_point(geoms, fracs, normalized=True)
+    return list(format_wkt(points, precision))
+
+
+def enrich_points(graph: Graph, new_triples: Graph,
+                  le_index: Dict[URIRef, LinearElementGeometry]) -> int:
+    """Interpolate POINT geometries for NetPointReferences without geometry.
+
+    The (element, offset) pairs of all references are collected first and
+    interpolated in batches (see interpolate_points()).
+    """
+    refs, items = [], []
     for ref in graph.subjects(RDF.type, ERA.NetPointReference):
         if any(graph.objects(ref, GSP.hasGeometry)):
             continue
@@ -104,25 +375,97 @@ def enrich_points(graph: Graph, new_triples: Graph) -> int:
             continue
 
         offset = float(offset_lit)
-        le_geom, le_len = get_le_geometry(graph, le)
-        if not le_geom or not le_len:
+        le_entry = le_index.get(le)
+        if le_entry is None:
             continue
 
-        frac = max(0.0, min(1.0, offset / le_len))
-        point = le_geom.interpolate(frac, normalized=True)
-        add_geometry(graph, new_triples, ref, "point", point.wkt)
-        count += 1
+        refs.append(ref)
+        items.append((str(le), max(0.0, min(1.0, offset / le_entry.length))))
 
-    return count
+    if not refs:
+        return 0
+    elements = {str(le): entry for le, entry in le_index.items()}
+    wkts = compute_in_chunks(interpolate_points, items, elements, lambda item: (item[0],))
+    for ref, wkt_str in zip(refs, wkts):
+        add_geometry(graph, new_triples, ref, "point", wkt_str)
+
+    return len(refs)
 
 
 # ---------------------------------------------------------------------------
 # NetLinearReference -> LINESTRING
 # ---------------------------------------------------------------------------
 
-def enrich_lines(graph: Graph, new_triples: Graph) -> int:
-    """Build LINESTRING geometries for NetLinearReferences without geometry."""
-    count = 0
+def join_sequences(items: List[Tuple[List[Hashable], float, float]],
+                   elements: Dict[Hashable, LinearElementGeometry],
+                   precision: Optional[int] = None) -> List[Optional[str]]:
+    """Build the LINESTRING WKT of (elements, start, end) sequence items.
+
+    The first and last element of each sequence are cut at the start and end
+    fractions. These windows are cut for all items in one batch (see
+    batch_substrings()); the pieces are then joined per item.
+
+    Returns:
+        The WKT of each item, or None when fewer than two points remain
+    """
+    # Per item: pieces that are either a whole element or a window index
+    sequences = []
+    windows = []
+    for keys, start, end in items:
+        pieces = []
+        for i, key in enumerate(keys):
+            le_entry = elements[key]
+            is_first = i == 0
+            is_last = i == len(keys) - 1
+
+            if is_first or is_last:
+                pieces.append(len(windows))
+                windows.append((le_entry, start if is_first else 0.0, end if is_last else 1.0))
+            else:
+                pieces.append(le_entry.coords)
+        sequences.append(pieces)
+
+    window_coords = batch_substrings(windows)
+
+    result = []
+    for pieces in sequences:
+        parts = []
+        prev = None
+        total = 0
+        for piece in pieces:
+            coords = window_coords[piece] if isinstance(piece, int) else piece
+            if coords is None:
+                continue
+
+            # Check orientation for connectivity with previous segment
+            if prev is not None and len(coords) >= 2:
+                d_fwd = (prev[0] - coords[0][0]) ** 2 + (prev[1] - coords[0][1]) ** 2
+                d_rev = (prev[0] - coords[-1][0]) ** 2 + (prev[1] - coords[-1][1]) ** 2
+                if d_rev < d_fwd:
+                    coords = coords[::-1]
+
+            # Remove duplicate junction point
+            if prev is not None and len(coords):
+                if abs(prev[0] - coords[0][0]) < 1e-10 and abs(prev[1] - coords[0][1]) < 1e-10:
+                    coords = coords[1:]
+
+            if len(coords):
+                parts.append(coords)
+                prev = coords[-1]
+                total += len(coords)
+
+        result.append(format_wkt(LineString(np.vstack(parts)), precision) if total >= 2 else None)
+    return result
+
+
+def enrich_lines(graph: Graph, new_triples: Graph,
+                 le_index: Dict[URIRef, LinearElementGeometry], lists: RdfLists) -> int:
+    """Build LINESTRING geometries for NetLinearReferences without geometry.
+
+    The element sequences of all references are collected first and joined
+    in batches (see join_sequences()).
+    """
+    refs, items = [], []
     for ref in graph.subjects(RDF.type, ERA.NetLinearReference):
         if any(graph.objects(ref, GSP.hasGeometry)):
             continue
@@ -151,58 +494,24 @@ def enrich_lines(graph: Graph, new_triples: Graph) -> int:
             continue
         end_offset = float(end_offset_lit)
 
-        elements = rdf_list_items(graph, seq_head)
+        elements = list_items(lists, seq_head)
         if not elements:
             continue
 
-        all_coords = []
-        valid = True
-
-        for i, le in enumerate(elements):
-            le_geom, le_len = get_le_geometry(graph, le)
-            if not le_geom or not le_len:
-                valid = False
-                break
-
-            is_first = i == 0
-            is_last = i == len(elements) - 1
-
-            if is_first and is_last:
-                s = max(0.0, min(1.0, start_offset / le_len))
-                e = max(0.0, min(1.0, end_offset / le_len))
-                seg = substring(le_geom, s, e, normalized=True)
-            elif is_first:
-                s = max(0.0, min(1.0, start_offset / le_len))
-                seg = substring(le_geom, s, 1.0, normalized=True)
-            elif is_last:
-                e = max(0.0, min(1.0, end_offset / le_len))
-                seg = substring(le_geom, 0.0, e, normalized=True)
-            else:
-                seg = le_geom
-
-            if seg.is_empty or seg.geom_type == "Point":
-                continue
-
-            coords = list(seg.coords)
-
-            # Check orientation for connectivity with previous segment
-            if all_coords and len(coords) >= 2:
-                prev = all_coords[-1]
-                d_fwd = (prev[0] - coords[0][0]) ** 2 + (prev[1] - coords[0][1]) ** 2
-                d_rev = (prev[0] - coords[-1][0]) ** 2 + (prev[1] - coords[-1][1]) ** 2
-                if d_rev < d_fwd:
-                    coords = coords[::-1]
-
-            # Remove duplicate junction point
-            if all_coords and coords:
-                p1, p2 = all_coords[-1], coords[0]
-                if abs(p1[0] - p2[0]) < 1e-10 and abs(p1[1] - p2[1]) < 1e-10:
-                    coords = coords[1:]
+        if any(le not in le_index for le in elements):
+            continue
 
-            all_coords.extend(coords)
+        start = max(0.0, min(1.0, start_offset / le_index[elements[0]].length))
+        end = max(0.0, min(1.0, end_offset / le_index[elements[-1]].length))
+        refs.append(ref)
+        items.append(([str(le) for le in elements], start, end))
 
-        if valid and len(all_coords) >= 2:
-            add_geometry(graph, new_triples, ref, "linestring", LineString(all_coords).wkt)
+    count = 0
+    elements = {str(le): entry for le, entry in le_index.items()}
+    wkts = compute_in_chunks(join_sequences, items, elements, lambda item: item[0])
+    for ref, wkt_str in zip(refs, wkts):
+        if wkt_str is not None:
+            add_geometry(graph, new_triples, ref, "linestring", wkt_str)
             count += 1
 
     return count
@@ -212,9 +521,18 @@ def enrich_lines(graph: Graph, new_triples: Graph) -> int:
 # NetAreaReference -> MULTILINESTRING
 # ---------------------------------------------------------------------------
 
-def enrich_areas(graph: Graph, new_triples: Graph) -> int:
+def combine_lines(items: List[List[str]], precision: Optional[int] = None) -> List[Optional[str]]:
+    """Combine the LINESTRING WKT of each item into a MULTILINESTRING WKT (None without lines)."""
+    result = []
+    for wkts in items:
+        lines = [geom for geom in map(parse_wkt, wkts) if isinstance(geom, LineString)]
+        result.append(format_wkt(MultiLineString(lines), precision) if lines else None)
+    return result
+
+
+def enrich_areas(graph: Graph, new_triples: Graph, lists: RdfLists) -> int:
     """Combine included NetLinearReference geometries into MULTILINESTRING."""
-    count = 0
+    refs, items = [], []
     for ref in graph.subjects(RDF.type, ERA.NetAreaReference):
         if any(graph.objects(ref, GSP.hasGeometry)):
             continue
@@ -223,8 +541,8 @@ def enrich_areas(graph: Graph, new_triples: Graph) -> int:
         if not includes_head:
             continue
 
-        included = rdf_list_items(graph, includes_head)
-        lines = []
+        included = list_items(lists, includes_head)
+        wkts = []
         for inc in included:
             geom_node = next(graph.objects(inc, GSP.hasGeometry), None)
             if not geom_node:
@@ -232,12 +550,15 @@ def enrich_areas(graph: Graph, new_triples: Graph) -> int:
             wkt_val = next(graph.objects(geom_node, GSP.asWKT), None)
             if not wkt_val:
                 continue
-            geom = parse_wkt(wkt_val)
-            if isinstance(geom, LineString):
-                lines.append(geom)
+            wkts.append(str(wkt_val))
 
-        if lines:
-            add_geometry(graph, new_triples, ref, "multilinestring", MultiLineString(lines).wkt)
+        refs.append(ref)
+        items.append(wkts)
+
+    count = 0
+    for ref, wkt_str in zip(refs, compute_in_chunks(combine_lines, items)):
+        if wkt_str is not None:
+            add_geometry(graph, new_triples, ref, "multilinestring", wkt_str)
             count += 1
 
     return count
@@ -259,28 +580,15 @@ def _geom_type_label(geom) -> str:
     return mapping.get(geom.geom_type, "geometry")
 
 
-def enrich_subjects(graph: Graph, new_triples: Graph) -> int:
-    """Add a combined geometry to subjects of era:netReference that lack one."""
-    count = 0
-    seen = set()
-
-    for subject in graph.subjects(ERA.netReference, None):
-        if subject in seen:
-            continue
-        seen.add(subject)
-
-        if any(graph.objects(subject, GSP.hasGeometry)):
-            continue
-
-        geoms = []
-        for ref in graph.objects(subject, ERA.netReference):
-            for geom_node in graph.objects(ref, GSP.hasGeometry):
-                for wkt_val in graph.objects(geom_node, GSP.asWKT):
-                    geoms.append(parse_wkt(wkt_val))
-
-        if not geoms:
-            continue
+def combine_geometries(items: List[List[str]], precision: Optional[int] = None) -> List[Tuple[str, str]]:
+    """Combine the WKT of each item into one geometry.
 
+    Returns:
+        Tuples of (geometry type label, WKT) per item
+    """
+    result = []
+    for wkts in items:
+        geoms = [parse_wkt(w) for w in wkts]
         if len(geoms) == 1:
             combined = geoms[0]
         else:
@@ -297,11 +605,382 @@ def enrich_subjects(graph: Graph, new_triples: Graph) -> int:
                 combined = MultiLineString(lines)
             else:
                 combined = GeometryCollection(geoms)
+        result.append((_geom_type_label(combined), format_wkt(combined, precision)))
+    return result
+
+
+def simplify_levels(items: List[str], resolutions: List[float],
+                    precision: Optional[int] = None) -> List[List[Tuple[float, str, str]]]:
+    """Simplify each WKT at every resolution, from fine to coarse.
+
+    Simplification preserves topology (shapely.simplify with
+    preserve_topology=True), so levels stay valid geometries. A level that
+    gives the same WKT as the previous one (or as the full geometry) is
+    left out: consumers picking the coarsest level within their resolution
+    get the finer, identical one instead.
+
+    Args:
+        items: Full-detail WKT per geometry
+        resolutions: Ascending resolutions in meters
+        precision: Decimals of the simplified WKT
+
+    Returns:
+        (resolution, geometry type label, WKT) tuples of the distinct levels per item
+    """
+    geoms = shapely.from_wkt(items)
+    result = [[] for _ in items]
+    previous = list(items)
+    for resolution in resolutions:
+        simplified = shapely.simplify(geoms, resolution / METERS_PER_DEGREE, preserve_topology=True)
+        for i, wkt_str in enumerate(format_wkt(simplified, precision)):
+            if wkt_str != previous[i]:
+                label = f"{_geom_type_label(simplified[i])}_{resolution:g}m"
+                result[i].append((resolution, label, wkt_str))
+                previous[i] = wkt_str
+    return result
+
+
+def add_simplified_geometries(graph: Graph, new_triples: Graph, subject: URIRef,
+                              levels: List[Tuple[float, str, str]]):
+    """Link the simplified levels of a subject geometry (see simplify_levels())."""
+    for resolution, geom_type, wkt_str in levels:
+        uri, new = store_geometry(geom_type, wkt_str)
+        for g in (graph, new_triples):
+            g.add((subject, SIMPLIFIED_GEOMETRY, uri))
+            if new:
+                g.add((uri, RDF.type, GSP.Geometry))
+                g.add((uri, GSP.asWKT, Literal(wkt_str, datatype=GSP.wktLiteral)))
+                g.add((uri, GSP.hasMetricSpatialResolution, Literal(str(resolution), datatype=XSD.double)))
+
+
+def enrich_subjects(graph: Graph, new_triples: Graph) -> Tuple[int, int]:
+    """Add a combined geometry to subjects of era:netReference that lack one.
+
+    Returns:
+        Tuple of (subjects enriched, simplified geometries linked)
+    """
+    subjects, items = [], []
+    seen = set()
+
+    for subject in graph.subjects(ERA.netReference, None):
+        if subject in seen:
+            continue
+        seen.add(subject)
 
-        add_geometry(graph, new_triples, subject, _geom_type_label(combined), combined.wkt)
-        count += 1
+        if any(graph.objects(subject, GSP.hasGeometry)):
+            continue
 
-    return count
+        wkts = []
+        for ref in graph.objects(subject, ERA.netReference):
+            for geom_node in graph.objects(ref, GSP.hasGeometry):
+                for wkt_val in graph.objects(geom_node, GSP.asWKT):
+                    wkts.append(str(wkt_val))
+
+        if not wkts:
+            continue
+
+        subjects.append(subject)
+        items.append(wkts)
+
+    results = compute_in_chunks(combine_geometries, items)
+    for subject, (label, wkt_str) in zip(subjects, results):
+        add_geometry(graph, new_triples, subject, label, wkt_str)
+
+    n_levels = 0
+    if SIMPLIFY_RESOLUTIONS:
+        simplify = partial(simplify_levels, resolutions=SIMPLIFY_RESOLUTIONS)
+        levels = compute_in_chunks(simplify, [wkt_str for _, wkt_str in results])
+        for subject, subject_levels in zip(subjects, levels):
+            add_simplified_geometries(graph, new_triples, subject, subject_levels)
+            n_levels += len(subject_levels)
+
+    return len(subjects), n_levels
+
+
+# ---------------------------------------------------------------------------
+# Triple-table backend (--backend tables)
+# ---------------------------------------------------------------------------
+
+class TripleTable(NamedTuple):
+    """Dictionary-encoded triples.
+
+    `triples` holds one UInt32 (s, p, o) row per triple, in input order;
+    `terms` maps each id to its N-Triples form (`term`) and, for literals,
+    its lexical form (`value`).
+    """
+    triples: "pl.DataFrame"
+    terms: "pl.DataFrame"
+
+
+def load_triple_table(**source) -> TripleTable:
+    """Parse RDF with pyoxigraph into a TripleTable.
+
+    Args:
+        source: pyoxigraph.parse() arguments (path= or input=, and format=)
+    """
+    return build_triple_table(pyoxigraph.parse(**source))
+
+
+def build_triple_table(triples: Iterable) -> TripleTable:
+    """Dictionary-encode pyoxigraph triples (or quads, e.g. of a Store) into a TripleTable."""
+    ids: Dict[str, int] = {}
+    values: List[Optional[str]] = []
+    columns = (array("I"), array("I"), array("I"))
+    for triple in triples:
+        for column, term in zip(columns, (triple.subject, triple.predicate, triple.object)):
+            key = str(term)
+            term_id = ids.get(key)
+            if term_id is None:
+                term_id = ids[key] = len(ids)
+                values.append(term.value if isinstance(term, pyoxigraph.Literal) else None)
+            column.append(term_id)
+
+    triples = pl.DataFrame({
+        name: np.frombuffer(column, dtype=np.uint32) for name, column in zip("spo", columns)
+    }).unique(maintain_order=True)
+    terms = pl.DataFrame({
+        "id": pl.Series(range(len(ids)), dtype=pl.UInt32),
+        "term": list(ids),
+        "value": values,
+    })
+    return TripleTable(triples, terms)
+
+
+def term_id(table: TripleTable, iri: URIRef) -> Optional[int]:
+    """Return the id of an IRI in the table, or None if it does not occur."""
+    match = table.terms.filter(pl.col("term") == f"<{iri}>")
+    return match["id"][0] if match.height else None
+
+
+def table_pairs(table: TripleTable, predicate: URIRef, s: str = "s", o: str = "o",
+                first: bool = False) -> "pl.DataFrame":
+    """(s, o) id pairs of a predicate in input order, renamed to the given columns.
+
+    With first=True only the first object per subject is kept, like
+    next(graph.objects(s, predicate)) on an rdflib graph.
+    """
+    pid = term_id(table, predicate)
+    pairs = table.triples.filter(pl.col("p") == pid if pid is not None else pl.lit(False))
+    pairs = pairs.select(pl.col("s").alias(s), pl.col("o").alias(o))
+    return pairs.unique(subset=s, keep="first", maintain_order=True) if first else pairs
+
+
+def with_values(df: "pl.DataFrame", table: TripleTable, column: str, name: str) -> "pl.DataFrame":
+    """Add the lexical value of the terms in `column` as column `name` (null for non-literals)."""
+    values = table.terms.select(pl.col("id").alias(column), pl.col("value").alias(name))
+    return df.join(values, on=column, how="left", maintain_order="left")
+
+
+def typed_subjects(table: TripleTable, rdf_type: URIRef) -> "pl.DataFrame":
+    """Subjects (column `s`) of the given rdf:type, in input order."""
+    tid = term_id(table, rdf_type)
+    typed = table_pairs(table, RDF.type).filter(pl.col("o") == tid if tid is not None else pl.lit(False))
+    return typed.select("s").unique(maintain_order=True)
+
+
+def decode_table_lists(table: TripleTable) -> RdfLists:
+    """Decode the RDF lists of a TripleTable (see rdf_lists.decode_lists())."""
+    firsts = table_pairs(table, RDF.first, first=True)
+    rests = table_pairs(table, RDF.rest, first=True)
+    return decode_lists(dict(zip(firsts["s"].to_list(), firsts["o"].to_list())),
+                        dict(zip(rests["s"].to_list(), rests["o"].to_list())),
+                        term_id(table, RDF.nil))
+
+
+def table_list_items(lists: RdfLists, heads: "pl.Series") -> "pl.DataFrame":
+    """Items of the lists starting at `heads` as a (head, pos, item) DataFrame, in head order."""
+    rows = [(head, pos, item) for head in heads.unique(maintain_order=True).to_list()
+            for pos, item in enumerate(list_items(lists, head))]
+    return pl.DataFrame(rows, schema={"head": pl.UInt32, "pos": pl.UInt32, "item": pl.UInt32},
+                        orient="row")
+
+
+def build_table_le_index(table: TripleTable) -> Tuple[Dict[int, LinearElementGeometry], "pl.DataFrame"]:
+    """Index the LinearElement geometries of a TripleTable, like build_le_index().
+
+    Returns:
+        Tuple of (geometries keyed by term id, DataFrame of (le, length))
+    """
+    lengths = with_values(table_pairs(table, ERA.lengthOfNetLinearElement, "le", "length_id"),
+                          table, "length_id", "length")
+    lengths = (lengths.select("le", pl.col("length").cast(pl.Float64))
+               .filter(pl.col("length") != 0)
+               .unique(subset="le", keep="first", maintain_order=True))
+
+    geometries = table_pairs(table, GSP.hasGeometry, "le", "node").join(
+        with_values(table_pairs(table, GSP.asWKT, "node", "wkt_id", first=True), table, "wkt_id", "wkt"),
+        on="node", maintain_order="left")
+    geometries = geometries.unique(subset="le", keep="first", maintain_order=True).select("le", "wkt")
+
+    index = {}
+    for le, length, wkt_str in lengths.join(geometries, on="le", maintain_order="left").iter_rows():
+        geom = parse_wkt(wkt_str)
+        if not geom:
+            continue
+        coords = shapely.get_coordinates(geom)
+        dx, dy = np.diff(coords, axis=0).T
+        cumulative = np.concatenate(([0.0], np.cumsum(np.power(dx * dx + dy * dy, 0.5))))
+        index[le] = LinearElementGeometry(geom, length, coords, cumulative)
+
+    return index, lengths.filter(pl.col("le").is_in(list(index)))
+
+
+def table_geometries(table: TripleTable) -> "pl.DataFrame":
+    """(s, wkt) of every gsp:hasGeometry link in input order (wkt is null without gsp:asWKT)."""
+    wkts = with_values(table_pairs(table, GSP.asWKT, "node", "wkt_id"), table, "wkt_id", "wkt")
+    return (table_pairs(table, GSP.hasGeometry, "s", "node")
+            .join(wkts, on="node", how="left", maintain_order="left_right")
+            .select("s", "wkt"))
+
+
+def table_offsets(table: TripleTable, ref: str, offset: str) -> "pl.DataFrame":
+    """(ref, tc, offset) of the first topological coordinate of references and its first offset."""
+    offsets = with_values(table_pairs(table, ERA.offsetFromOrigin, "tc", "offset_id", first=True),
+                          table, "offset_id", offset)
+    return (table_pairs(table, ERA.hasTopoCoordinate, ref, "tc", first=True)
+            .join(offsets, on="tc", maintain_order="left")
+            .select(ref, "tc", pl.col(offset).cast(pl.Float64)))
+
+
+def enrich_tables(table: TripleTable, le_index: Dict[int, LinearElementGeometry],
+                  le_lengths: "pl.DataFrame", lists: RdfLists) -> Tuple["pl.DataFrame", List[int]]:
+    """Run the enrich phases on a TripleTable.
+
+    References are resolved through joins instead of per-triple graph
+    lookups; the geometries are computed by the same functions as the
+    rdflib backend (see compute_in_chunks()), so the results are the same.
+    New geometries are appended to the (s, wkt) geometry table as each
+    phase completes, which keeps the points -> lines -> areas -> subjects
+    dependencies. With SIMPLIFY_RESOLUTIONS, the simplified levels of the
+    subject geometries follow as rows with their `resolution` (null for
+    the full geometries) and their count is a fifth phase count.
+
+    Returns:
+        Tuple of (new geometries as (s, type, wkt, resolution) DataFrame, count per phase)
+    """
+    geometries = table_geometries(table)
+    new = []
+    counts = []
+    schema = {"s": pl.UInt32, "type": pl.String, "wkt": pl.String, "resolution": pl.Float64}
+
+    def add(subjects: List[int], labels: List[str], wkts: List[Optional[str]]):
+        rows = pl.DataFrame({"s": subjects, "type": labels, "wkt": wkts,
+                             "resolution": [None] * len(subjects)}, schema=schema)
+        rows = rows.filter(pl.col("wkt").is_not_null())
+        new.append(rows)
+        counts.append(rows.height)
+        return pl.concat([geometries, rows.select("s", "wkt")])
+
+    def without_geometry(df: "pl.DataFrame") -> "pl.DataFrame":
+        return df.join(geometries, on="s", how="anti", maintain_order="left")
+
+    # NetPointReference -> POINT
+    points = (without_geometry(typed_subjects(table, ERA.NetPointReference))
+              .join(table_offsets(table, "s", "offset"), on="s", maintain_order="left")
+              .join(table_pairs(table, ERA.onLinearElement, "tc", "le", first=True), on="tc", maintain_order="left")
+              .join(le_lengths, on="le", maintain_order="left")
+              .with_columns(frac=(pl.col("offset") / pl.col("length")).clip(0.0, 1.0)))
+    items = list(points.select("le", "frac").iter_rows())
+    wkts = compute_in_chunks(interpolate_points, items, le_index, lambda item: (item[0],))
+    geometries = add(points["s"].to_list(), ["point"] * points.height, wkts)
+
+    # NetLinearReference -> LINESTRING
+    lines = (without_geometry(typed_subjects(table, ERA.NetLinearReference))
+             .join(table_pairs(table, ERA.startsAt, "s", "start_ref", first=True), on="s", maintain_order="left")
+             .join(table_pairs(table, ERA.endsAt, "s", "end_ref", first=True), on="s", maintain_order="left")
+             .join(table_pairs(table, ERA.hasSequence, "s", "head", first=True), on="s", maintain_order="left")
+             .join(table_offsets(table, "start_ref", "start").drop("tc"), on="start_ref", maintain_order="left")
+             .join(table_offsets(table, "end_ref", "end").drop("tc"), on="end_ref", maintain_order="left"))
+    sequences = (table_list_items(lists, lines["head"])
+                 .group_by("head", maintain_order=True).agg("item"))
+    lines = lines.join(sequences, on="head", maintain_order="left")
+    subjects, items = [], []
+    for s, start, end, elements in lines.select("s", "start", "end", "item").iter_rows():
+        if any(le not in le_index for le in elements):
+            continue
+        subjects.append(s)
+        items.append((elements,
+                      max(0.0, min(1.0, start / le_index[elements[0]].length)),
+                      max(0.0, min(1.0, end / le_index[elements[-1]].length))))
+    wkts = compute_in_chunks(join_sequences, items, le_index, lambda item: item[0])
+    geometries = add(subjects, ["linestring"] * len(subjects), wkts)
+
+    # NetAreaReference -> MULTILINESTRING (first geometry of each included reference)
+    areas = (without_geometry(typed_subjects(table, ERA.NetAreaReference))
+             .join(table_pairs(table, ERA.includes, "s", "head", first=True), on="s", maintain_order="left"))
+    included = (table_list_items(lists, areas["head"])
+                .join(geometries.unique(subset="s", keep="first", maintain_order=True)
+                      .rename({"s": "item"}), on="item", maintain_order="left")
+                .drop_nulls("wkt")
+                .group_by("head", maintain_order=True).agg("wkt"))
+    areas = areas.join(included, on="head", how="left", maintain_order="left")
+    items = [wkt_list or [] for wkt_list in areas["wkt"].to_list()]
+    wkts = compute_in_chunks(combine_lines, items)
+    geometries = add(areas["s"].to_list(), ["multilinestring"] * areas.height, wkts)
+
+    # Subjects of era:netReference -> combined geometry
+    references = table_pairs(table, ERA.netReference, "s", "ref")
+    subjects = without_geometry(references.select("s").unique(maintain_order=True))
+    combined = (references.join(subjects, on="s", how="semi", maintain_order="left")
+                .join(geometries.rename({"s": "ref"}), on="ref", maintain_order="left_right")
+                .drop_nulls("wkt")
+                .group_by("s", maintain_order=True).agg("wkt"))
+    results = compute_in_chunks(combine_geometries, combined["wkt"].to_list())
+    add(combined["s"].to_list(), [label for label, _ in results], [w for _, w in results])
+
+    if SIMPLIFY_RESOLUTIONS:
+        simplify = partial(simplify_levels, resolutions=SIMPLIFY_RESOLUTIONS)
+        levels = compute_in_chunks(simplify, [w for _, w in results])
+        rows = [(s, label, wkt_str, resolution)
+                for s, subject_levels in zip(combined["s"].to_list(), levels)
+                for resolution, label, wkt_str in subject_levels]
+        new.append(pl.DataFrame(rows, schema=schema, orient="row"))
+        counts.append(len(rows))
+
+    return pl.concat(new), counts
+
+
+def new_geometry_ntriples(table: TripleTable, new: "pl.DataFrame") -> List[str]:
+    """N-Triples lines of the new geometries, as add_geometry() would add them."""
+    subjects = new.join(table.terms.select(pl.col("id").alias("s"), "term"), on="s", maintain_order="left")
+    has_geometry = f"<{GSP.hasGeometry}>"
+    has_simplified = f"<{SIMPLIFIED_GEOMETRY}>"
+    geometry_type = f"<{RDF.type}> <{GSP.Geometry}>"
+    as_wkt = f"<{GSP.asWKT}>"
+    has_resolution = f"<{GSP.hasMetricSpatialResolution}>"
+    wkt_datatype = pyoxigraph.NamedNode(str(GSP.wktLiteral))
+    double_datatype = pyoxigraph.NamedNode(str(XSD.double))
+
+    lines = {}
+    for subject, geom_type, wkt_str, resolution in subjects.select("term", "type", "wkt", "resolution").iter_rows():
+        uri, new = store_geometry(geom_type, wkt_str)
+        link = has_geometry if resolution is None else has_simplified
+        lines[f"{subject} {link} <{uri}> ."] = None
+        if new:
+            literal = pyoxigraph.Literal(wkt_str, datatype=wkt_datatype)
+            lines[f"<{uri}> {geometry_type} ."] = None
+            lines[f"<{uri}> {as_wkt} {literal} ."] = None
+            if resolution is not None:
+                literal = pyoxigraph.Literal(str(resolution), datatype=double_datatype)
+                lines[f"<{uri}> {has_resolution} {literal} ."] = None
+    return list(lines)
+
+
+def write_table_ntriples(table: TripleTable, new_lines: List[str], path: str):
+    """Write the triples of a TripleTable followed by `new_lines` as N-Triples."""
+    terms = table.terms.select("id", "term")
+    lines = table.triples
+    for column in "spo":
+        lines = lines.join(terms.rename({"id": column, "term": f"{column}_term"}),
+                           on=column, how="left", maintain_order="left")
+    lines = lines.select(pl.concat_str(["s_term", "p_term", "o_term"], separator=" ") + " .")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for chunk in lines.iter_slices():
+            f.write("\n".join(chunk.to_series()) + "\n")
+        if new_lines:
+            f.write("\n".join(new_lines) + "\n")
 
 
 # ---------------------------------------------------------------------------
@@ -329,6 +1008,56 @@ def load_graph_from_fuseki() -> Graph:
     return g
 
 
+def enrichment_input_triples(solutions: Iterable) -> Iterator:
+    """Turn the ?s ?p ?o solutions of ENRICHMENT_INPUT_QUERY into pyoxigraph triples.
+
+    Raises:
+        ValueError: If a solution holds a blank node. Its label is only
+            valid inside the result set, so geometries uploaded for it
+            would attach to a new node instead of the one in Fuseki.
+    """
+    for solution in solutions:
+        s, p, o = solution["s"], solution["p"], solution["o"]
+        if isinstance(s, pyoxigraph.BlankNode) or isinstance(o, pyoxigraph.BlankNode):
+            raise ValueError(f"Blank node in the enrichment input ({s} {p} {o}); "
+                             "--targeted needs IRIs for every reference, list and geometry node")
+        yield pyoxigraph.Triple(s, p, o)
+
+
+def fetch_enrichment_table() -> TripleTable:
+    """Fetch only the triples the enrich phases read from Fuseki into a TripleTable.
+
+    ENRICHMENT_INPUT_QUERY returns them as ?s ?p ?o columns in TSV; the
+    solutions are parsed with pyoxigraph's result-set parser and encoded
+    into the table directly, without an intermediate RDF document or graph.
+    Transfer and parse cost follow the number of references instead of the
+    graph size.
+    """
+    r = requests.post(
+        FUSEKI_QUERY,
+        data={"query": ENRICHMENT_INPUT_QUERY},
+        headers={"Accept": "text/tab-separated-values"},
+        timeout=120,
+    )
+    r.raise_for_status()
+    solutions = pyoxigraph.parse_query_results(r.content, format=pyoxigraph.QueryResultsFormat.TSV)
+    return build_triple_table(enrichment_input_triples(solutions))
+
+
+def load_table_from_fuseki(targeted: bool) -> TripleTable:
+    """Load the whole graph, or only the enrichment input, from Fuseki into a TripleTable."""
+    if targeted:
+        return fetch_enrichment_table()
+    r = requests.post(
+        FUSEKI_QUERY,
+        data={"query": "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"},
+        headers={"Accept": "application/n-triples"},
+        timeout=120,
+    )
+    r.raise_for_status()
+    return load_triple_table(input=r.content, format=pyoxigraph.RdfFormat.N_TRIPLES)
+
+
 def upload_triples_to_fuseki(new_triples: Graph):
     """POST only the new geometry triples to Fuseki (additive)."""
     ttl = new_triples.serialize(format="turtle")
@@ -341,12 +1070,191 @@ def upload_triples_to_fuseki(new_triples: Graph):
     r.raise_for_status()
 
 
+def upload_ntriples_to_fuseki(lines: List[str]):
+    """POST new triples, given as N-Triples lines, to Fuseki (additive)."""
+    r = requests.post(
+        FUSEKI_DATA,
+        data="".join(f"{line}\n" for line in lines).encode("utf-8"),
+        headers={"Content-Type": "application/n-triples"},
+        timeout=120,
+    )
+    r.raise_for_status()
+
+
+# ---------------------------------------------------------------------------
+# Append-only output (--append-only)
+# ---------------------------------------------------------------------------
+
+def is_ntriples(path: str) -> bool:
+    """Check that every line of a file is an N-Triples statement, a comment or blank."""
+    with open(path, "rb") as f:
+        return all(NTRIPLES_LINE.fullmatch(line.rstrip(b"\r\n")) for line in f)
+
+
+def ntriples_input() -> str:
+    """Return the path of INPUT_TTL in N-Triples form.
+
+    02-construct writes N-Triples, so the input is normally used as it is.
+    Otherwise it is converted once into INPUT_NT_CACHE, which is reused
+    while it is newer than the input.
+    """
+    if is_ntriples(INPUT_TTL):
+        return INPUT_TTL
+    if os.path.exists(INPUT_NT_CACHE) and os.path.getmtime(INPUT_NT_CACHE) >= os.path.getmtime(INPUT_TTL):
+        return INPUT_NT_CACHE
+
+    print(f"  Converting {INPUT_TTL} to N-Triples ({INPUT_NT_CACHE})...")
+    os.makedirs(os.path.dirname(INPUT_NT_CACHE) or ".", exist_ok=True)
+    if pyoxigraph is not None:
+        rdf_convert.convert(INPUT_TTL, INPUT_NT_CACHE)
+    else:
+        Graph().parse(INPUT_TTL, format="turtle").serialize(destination=INPUT_NT_CACHE, format="nt")
+    return INPUT_NT_CACHE
+
+
+def write_appended_output(new_ntriples: str):
+    """Write OUTPUT_TTL and OUTPUT_NT as the N-Triples input followed by the new triples.
+
+    N-Triples is valid Turtle, so both files get the same bytes, written in
+    one pass over the input without parsing or serializing it again.
+    """
+    source = ntriples_input()
+    for path in (OUTPUT_TTL, OUTPUT_NT):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    with open(source, "rb") as src, open(OUTPUT_TTL, "wb") as ttl, open(OUTPUT_NT, "wb") as nt:
+        last = b"\n"
+        while True:
+            chunk = src.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            ttl.write(chunk)
+            nt.write(chunk)
+            last = chunk[-1:]
+        tail = (b"" if last == b"\n" else b"\n") + new_ntriples.encode("utf-8")
+        ttl.write(tail)
+        nt.write(tail)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
+def enrich_triple_table(table: TripleTable) -> List[str]:
+    """Run all enrich phases on a TripleTable, printing progress.
+
+    Also used by run-post-process.py on the triples of its store.
+
+    Returns:
+        The new triples as N-Triples lines
+    """
+    le_index, le_lengths = build_table_le_index(table)
+    print(f"  Indexed {len(le_index)} LinearElement geometries")
+
+    lists = decode_table_lists(table)
+    report_lists(lists)
+
+    new, counts = enrich_tables(table, le_index, le_lengths, lists)
+    labels = ["NetPointReference geometries", "NetLinearReference geometries",
+              "NetAreaReference geometries", "subject geometries (via era:netReference)",
+              "simplified subject geometries"]
+    for label, n in zip(labels, counts):
+        print(f"  + {n} {label}")
+
+    new_lines = new_geometry_ntriples(table, new)
+    print(f"  {len(GEOMETRY_STORE)} distinct geometries")
+    return new_lines
+
+
+def run_tables_backend(fuseki: bool, targeted: bool, append_only: bool) -> int:
+    """Enrich with the triple-table backend and write N-Triples to OUTPUT_TTL."""
+    if pl is None or pyoxigraph is None:
+        print("  ❌ The tables backend requires polars and pyoxigraph (pip install polars pyoxigraph)")
+        return 1
+
+    if targeted:
+        print("  Extracting enrichment input from Fuseki...")
+        try:
+            table = load_table_from_fuseki(targeted)
+        except ValueError as e:
+            print(f"  ❌ {e}")
+            return 1
+    elif fuseki:
+        print("  Loading triple table from Fuseki...")
+        table = load_table_from_fuseki(targeted)
+    else:
+        print(f"  Fuseki not available - loading triple table from {INPUT_TTL}")
+        table = load_triple_table(path=INPUT_TTL, format=pyoxigraph.RdfFormat.TURTLE)
+
+    print(f"  Loaded {table.triples.height} triples ({table.terms.height} distinct terms)")
+
+    new_lines = enrich_triple_table(table)
+    if PROCESS_POOL is not None:
+        PROCESS_POOL.shutdown()
+    print(f"  {len(new_lines)} new triples, {table.triples.height + len(new_lines)} total triples")
+
+    if fuseki:
+        print("  Uploading new triples to Fuseki...")
+        upload_ntriples_to_fuseki(new_lines)
+        print("  ✓ Uploaded to Fuseki")
+
+    if targeted:
+        # Only part of the graph is in memory; the enriched graph is exported
+        # from Fuseki by run-post-process.ps1 (step 4)
+        return 0
+
+    if append_only:
+        write_appended_output("".join(f"{line}\n" for line in new_lines))
+        print(f"  ✓ Saved to {OUTPUT_TTL} and {OUTPUT_NT} (input + new triples)")
+        return 0
+
+    write_table_ntriples(table, new_lines, OUTPUT_TTL)
+    print(f"  ✓ Saved to {OUTPUT_TTL} (N-Triples)")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Enrich ERA network reference geometries")
+    parser.add_argument("--targeted", action="store_true",
+                        help="With Fuseki, extract only the triples the enrichment reads instead of "
+                             "the whole graph into the tables backend, and skip writing the full "
+                             "enriched graph to file")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes computing geometries (default: 1, no process pool)")
+    parser.add_argument("--backend", choices=["rdflib", "tables"], default="rdflib",
+                        help="Working store: an rdflib Graph (default) or dictionary-encoded "
+                             "triple tables (requires polars and pyoxigraph)")
+    parser.add_argument("--append-only", action="store_true",
+                        help="Without Fuseki, write the input bytes followed by the new geometry "
+                             f"triples to {OUTPUT_TTL} and {OUTPUT_NT} instead of re-serializing the graph")
+    parser.add_argument("--wkt-precision", type=int, default=None, metavar="DECIMALS",
+                        help="Round the coordinates of new WKT literals to DECIMALS decimals "
+                             "(default: full precision; 7 is ~1 cm for WGS84 degrees)")
+    parser.add_argument("--simplify", type=float, nargs="+", default=[], metavar="METERS",
+                        help="Also link topology-preserving simplified levels of each new subject "
+                             "geometry, one per resolution in meters (e.g. --simplify 10 100 1000)")
+    args = parser.parse_args()
+
+    global PROCESS_POOL, WORKERS, WKT_PRECISION, SIMPLIFY_RESOLUTIONS
+    WKT_PRECISION = args.wkt_precision
+    SIMPLIFY_RESOLUTIONS = sorted(set(args.simplify))
+    if any(resolution <= 0 for resolution in SIMPLIFY_RESOLUTIONS):
+        parser.error("--simplify resolutions must be positive")
+    if args.workers > 1:
+        WORKERS = args.workers
+        PROCESS_POOL = ProcessPoolExecutor(max_workers=WORKERS)
+        print(f"  Computing geometries on {WORKERS} worker processes")
+
     fuseki = check_fuseki()
+    targeted = fuseki and args.targeted
+    append_only = args.append_only and not fuseki
+    if args.append_only and fuseki and not targeted:
+        print("  ⚠️  --append-only ignored: the graph is loaded from Fuseki, not from the input file")
+
+    if args.backend == "tables" or targeted:
+        if targeted and args.backend != "tables":
+            print("  --targeted loads the enrichment input into the tables backend")
+        return run_tables_backend(fuseki, targeted, append_only)
 
     if fuseki:
         print("  Loading graph from Fuseki...")
@@ -363,20 +1271,32 @@ def main():
 
     new_triples = Graph()
 
+    le_index = build_le_index(graph)
+    print(f"  Indexed {len(le_index)} LinearElement geometries")
+
+    lists = decode_graph_lists(graph)
+    report_lists(lists)
+
     # Enrich in order: points -> lines -> areas -> subjects
     # (areas depend on line geometries, subjects depend on all reference geometries)
-    n = enrich_points(graph, new_triples)
+    n = enrich_points(graph, new_triples, le_index)
     print(f"  + {n} NetPointReference geometries")
 
-    n = enrich_lines(graph, new_triples)
+    n = enrich_lines(graph, new_triples, le_index, lists)
     print(f"  + {n} NetLinearReference geometries")
 
-    n = enrich_areas(graph, new_triples)
+    n = enrich_areas(graph, new_triples, lists)
     print(f"  + {n} NetAreaReference geometries")
 
-    n = enrich_subjects(graph, new_triples)
+    n, n_levels = enrich_subjects(graph, new_triples)
     print(f"  + {n} subject geometries (via era:netReference)")
+    if SIMPLIFY_RESOLUTIONS:
+        print(f"  + {n_levels} simplified subject geometries")
 
+    if PROCESS_POOL is not None:
+        PROCESS_POOL.shutdown()
+
+    print(f"  {len(GEOMETRY_STORE)} distinct geometries")
     print(f"  {len(new_triples)} new triples, {len(graph)} total triples")
 
     if fuseki:
@@ -384,10 +1304,16 @@ def main():
         upload_triples_to_fuseki(new_triples)
         print("  ✓ Uploaded to Fuseki")
 
+    if append_only:
+        write_appended_output(new_triples.serialize(format="nt"))
+        print(f"  ✓ Saved to {OUTPUT_TTL} and {OUTPUT_NT} (input + new triples)")
+        return 0
+
     os.makedirs(os.path.dirname(OUTPUT_TTL) or ".", exist_ok=True)
     graph.serialize(destination=OUTPUT_TTL, format="turtle")
     print(f"  ✓ Saved to {OUTPUT_TTL}")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
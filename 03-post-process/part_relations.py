@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Interval-index engine for the infer-part-relations updates.
+
+The three sparql-update/infer-part-relations-*.sparql files find
+era:isPartOf / era:hasPart pairs by joining every master window with every
+child on the same net element, walking the rdf:rest*/rdf:first lists inside
+that join. This module computes the same pairs on a pyoxigraph store:
+
+1. The RDF lists are decoded once (see rdf_lists.py) and the effective
+   window of every NetLinearReference on each net element of its sequence
+   is computed as the query comments describe (declared start offset on the
+   first element, else 0; declared end offset on the last element, else the
+   element length).
+2. The windows are put in one IntervalIndex per net element.
+3. Each point (a child's window start or end, a KilometerPost offset, a
+   stopping point position) looks up the windows containing it in
+   O(log n + matches) instead of being compared with all of them.
+
+run-post-process.py runs the engine in place of the three files (RULES maps
+each file to its rule). Comparisons follow the SPARQL semantics: a window
+bound that is not a numeric literal matches nothing.
+
+Usage (compare the engine with the SPARQL files on a graph):
+    python part_relations.py output/era-graph-enriched.nt
+"""
+
+import argparse
+import bisect
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from rdf_lists import RdfLists, decode_lists, list_items
+
+# Optional: the store the engine reads (pip install pyoxigraph)
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+ERA = "http://data.europa.eu/949/"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+SPARQL_UPDATE_DIR = Path(__file__).resolve().parent / "sparql-update"
+
+# Literal datatypes compared as numbers, as SPARQL does
+NUMERIC_DATATYPES = {f"{XSD}{name}" for name in (
+    "double", "float", "decimal", "integer", "int", "long", "short", "byte",
+    "nonNegativeInteger", "positiveInteger", "nonPositiveInteger", "negativeInteger",
+    "unsignedLong", "unsignedInt", "unsignedShort", "unsignedByte",
+)}
+
+
+class Window(NamedTuple):
+    """Effective window of a NetLinearReference on one net element."""
+    element: "pyoxigraph.NamedNode"  # net element (era:LinearElement)
+    start: Optional[float]  # None if the bound is not numeric
+    end: Optional[float]
+
+
+class IntervalIndex:
+    """
+    Static centered interval tree over closed [start, end] intervals.
+
+    Each node keeps the intervals containing its center sorted by start and
+    by end, so a stabbing query visits O(log n) nodes and only reads the
+    intervals that match. Intervals with start > end contain no point and
+    are left out.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, object]]):
+        self.root = self._build([i for i in intervals if i[0] <= i[1]])
+
+    def _build(self, intervals: List[Tuple[float, float, object]]):
+        if not intervals:
+            return None
+        bounds = sorted(b for start, end, _ in intervals for b in (start, end))
+        center = bounds[len(bounds) // 2]
+        left = [i for i in intervals if i[1] < center]
+        right = [i for i in intervals if i[0] > center]
+        here = [i for i in intervals if i[0] <= center <= i[1]]
+        by_start = sorted(here, key=lambda i: i[0])
+        by_end = sorted(here, key=lambda i: -i[1])
+        return (center, [i[0] for i in by_start], [i[2] for i in by_start],
+                [-i[1] for i in by_end], [i[2] for i in by_end],
+                self._build(left), self._build(right))
+
+    def stab(self, point: float) -> Iterator[object]:
+        """Values of the intervals with start <= point <= end."""
+        node = self.root
+        while node is not None:
+            center, starts, start_values, neg_ends, end_values, left, right = node
+            if point < center:
+                # Intervals here end at or after the center, so they contain
+                # the point when they start at or before it
+                yield from start_values[:bisect.bisect_right(starts, point)]
+                node = left
+            elif point > center:
+                yield from end_values[:bisect.bisect_right(neg_ends, -point)]
+                node = right
+            else:
+                yield from start_values
+                return
+
+
+class Network:
+    """The triples the part-relation rules read, indexed by subject."""
+
+    def __init__(self, store: "pyoxigraph.Store"):
+        self.store = store
+        self.types = self.objects(f"{RDF}type")
+        self.net_references = self.objects(f"{ERA}netReference")
+        self.includes = self.objects(f"{ERA}includes")
+        self.sequences = self.objects(f"{ERA}hasSequence")
+        self.starts_at = self.objects(f"{ERA}startsAt")
+        self.ends_at = self.objects(f"{ERA}endsAt")
+        self.topo_coordinates = self.objects(f"{ERA}hasTopoCoordinate")
+        self.on_element = self.objects(f"{ERA}onLinearElement")
+        self.offsets = self.objects(f"{ERA}offsetFromOrigin")
+        self.lengths = self.objects(f"{ERA}lengthOfNetLinearElement")
+        firsts = {s: o[0] for s, o in self.objects(f"{RDF}first").items()}
+        rests = {s: o[0] for s, o in self.objects(f"{RDF}rest").items()}
+        self.lists: RdfLists = decode_lists(firsts, rests, pyoxigraph.NamedNode(f"{RDF}nil"))
+
+    def objects(self, predicate: str) -> Dict:
+        """Objects of `predicate` per subject, in the default graph."""
+        result: Dict = {}
+        for quad in self.store.quads_for_pattern(None, pyoxigraph.NamedNode(predicate), None,
+                                                 pyoxigraph.DefaultGraph()):
+            result.setdefault(quad.subject, []).append(quad.object)
+        return result
+
+    def has_type(self, node, rdf_type: str) -> bool:
+        return pyoxigraph.NamedNode(f"{ERA}{rdf_type}") in self.types.get(node, ())
+
+    def typed(self, *rdf_types: str) -> List:
+        """Subjects with any of the given era: types, in store order."""
+        wanted = {pyoxigraph.NamedNode(f"{ERA}{t}") for t in rdf_types}
+        return [s for s, types in self.types.items() if wanted.intersection(types)]
+
+    def positions(self, reference, typed: bool = True) -> Iterator[Tuple[object, Optional[float]]]:
+        """(net element, offset) of the topological coordinates of a reference.
+
+        With `typed`, only coordinates typed era:TopologicalCoordinate count.
+        """
+        for coordinate in self.topo_coordinates.get(reference, ()):
+            if typed and not self.has_type(coordinate, "TopologicalCoordinate"):
+                continue
+            for element in self.on_element.get(coordinate, ()):
+                for offset in self.offsets.get(coordinate, ()):
+                    yield element, numeric(offset)
+
+    def linear_windows(self, reference) -> Iterator[Window]:
+        """Effective windows of a NetLinearReference on the elements of its sequence."""
+        if not self.has_type(reference, "NetLinearReference"):
+            return
+        for sequence in self.sequences.get(reference, ()):
+            elements = set(list_items(self.lists, sequence))
+            for start_ref in self.starts_at.get(reference, ()):
+                for end_ref in self.ends_at.get(reference, ()):
+                    for first, start in self.positions(start_ref):
+                        for last, end in self.positions(end_ref):
+                            for element in elements:
+                                for length in self.lengths.get(element, ()):
+                                    yield Window(element,
+                                                 start if element == first else 0.0,
+                                                 end if element == last else numeric(length))
+
+    def linear_references(self, part, area_references: bool = True) -> Iterator:
+        """NetLinearReferences of a part, directly or included by a NetAreaReference."""
+        for reference in self.net_references.get(part, ()):
+            yield reference
+            if area_references and self.has_type(reference, "NetAreaReference"):
+                for included in self.includes.get(reference, ()):
+                    yield from list_items(self.lists, included)
+
+    def window_index(self, parts: List, area_references: bool = True) -> Dict[object, IntervalIndex]:
+        """One IntervalIndex per net element over the windows of `parts` (values are the parts)."""
+        windows: Dict[object, List[Tuple[float, float, object]]] = {}
+        for part in parts:
+            for reference in self.linear_references(part, area_references):
+                for window in self.linear_windows(reference):
+                    if window.start is not None and window.end is not None:
+                        windows.setdefault(window.element, []).append((window.start, window.end, part))
+        return {element: IntervalIndex(intervals) for element, intervals in windows.items()}
+
+
+def numeric(term) -> Optional[float]:
+    """Value of a numeric literal, None for any other term."""
+    if isinstance(term, pyoxigraph.Literal) and term.datatype.value in NUMERIC_DATATYPES:
+        try:
+            return float(term.value)
+        except ValueError:
+            return None
+    return None
+
+
+def linear_parts(network: Network) -> Set[Tuple[object, object]]:
+    """infer-part-relations-linear: tracks within OperationalPoints and SectionsOfLine.
+
+    A track is part of a master when the start or the end of its window on
+    a shared net element falls within the master's window.
+    """
+    index = network.window_index(network.typed("OperationalPoint", "SectionOfLine"))
+    pairs = set()
+    for child in network.typed("RunningTrack", "Siding"):
+        for reference in network.linear_references(child, area_references=False):
+            for window in network.linear_windows(reference):
+                element_index = index.get(window.element)
+                if element_index is None:
+                    continue
+                for bound in (window.start, window.end):
+                    if bound is not None:
+                        pairs.update((child, master) for master in element_index.stab(bound))
+    return pairs
+
+
+def point_parts(network: Network) -> Set[Tuple[object, object]]:
+    """infer-part-relations-point: KilometerPosts within RunningTracks and Sidings."""
+    index = network.window_index(network.typed("RunningTrack", "Siding"))
+    pairs = set()
+    for child in network.typed("KilometerPost"):
+        for reference in network.net_references.get(child, ()):
+            if not network.has_type(reference, "NetPointReference"):
+                continue
+            for element, offset in network.positions(reference, typed=False):
+                if offset is not None and element in index:
+                    pairs.update((child, master) for master in index[element].stab(offset))
+    return pairs
+
+
+def stopping_point_parts(network: Network) -> Set[Tuple[object, object]]:
+    """infer-part-relations-op-stopping-point: tracks through point-referenced OperationalPoints."""
+    index = network.window_index(network.typed("Track", "RunningTrack", "Siding"), area_references=False)
+    pairs = set()
+    for master in network.typed("OperationalPoint"):
+        for reference in network.net_references.get(master, ()):
+            if not network.has_type(reference, "NetPointReference"):
+                continue
+            for element, position in network.positions(reference):
+                if position is not None and element in index:
+                    pairs.update((child, master) for child in index[element].stab(position))
+    return pairs
+
+
+# Update file -> rule computing its (child, master) pairs
+RULES: Dict[str, Callable[[Network], Set[Tuple[object, object]]]] = {
+    "infer-part-relations-linear.sparql": linear_parts,
+    "infer-part-relations-point.sparql": point_parts,
+    "infer-part-relations-op-stopping-point.sparql": stopping_point_parts,
+}
+
+
+def part_relation_triples(pairs: Iterable[Tuple[object, object]]) -> List["pyoxigraph.Quad"]:
+    """era:isPartOf and era:hasPart quads (default graph) of (child, master) pairs."""
+    is_part_of = pyoxigraph.NamedNode(f"{ERA}isPartOf")
+    has_part = pyoxigraph.NamedNode(f"{ERA}hasPart")
+    quads = []
+    for child, master in pairs:
+        quads.append(pyoxigraph.Quad(child, is_part_of, master, pyoxigraph.DefaultGraph()))
+        quads.append(pyoxigraph.Quad(master, has_part, child, pyoxigraph.DefaultGraph()))
+    return quads
+
+
+def apply_rule(store: "pyoxigraph.Store", update_file: str) -> int:
+    """
+    Insert the part relations of the rule replacing `update_file` into the store.
+
+    Returns:
+        Number of (child, master) pairs found
+    """
+    pairs = RULES[update_file](Network(store))
+    store.extend(part_relation_triples(pairs))
+    return len(pairs)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the part-relation engine with the SPARQL updates")
+    parser.add_argument("file", help="RDF file to check (Turtle or N-Triples)")
+    args = parser.parse_args()
+
+    if pyoxigraph is None:
+        print("  ❌ The part-relation engine requires pyoxigraph (pip install pyoxigraph)")
+        return 1
+
+    store = pyoxigraph.Store()
+    store.bulk_load(path=args.file, format=pyoxigraph.RdfFormat.from_extension(Path(args.file).suffix[1:]))
+    print(f"  Loaded {len(store)} triples")
+
+    network = Network(store)
+    mismatches = 0
+    for update_file, rule in RULES.items():
+        start = time.perf_counter()
+        expected = set(store.query(
+            (SPARQL_UPDATE_DIR / update_file).read_text(encoding="utf-8-sig")
+            .replace("INSERT {", "CONSTRUCT {", 1)))
+        sparql_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = {(q.subject, q.predicate, q.object) for q in part_relation_triples(rule(network))}
+        engine_seconds = time.perf_counter() - start
+
+        expected = {(t.subject, t.predicate, t.object) for t in expected}
+        status = "✓" if found == expected else "❌"
+        mismatches += found != expected
+        print(f"  {status} {update_file}: {len(found) // 2} pairs "
+              f"(engine {engine_seconds:.2f}s, SPARQL {sparql_seconds:.2f}s)")
+        if found != expected:
+            print(f"      {len(found - expected)} extra, {len(expected - found)} missing triples")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
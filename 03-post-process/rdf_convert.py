@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Streaming conversion between RDF serializations.
+
+convert() reads the source with pyoxigraph's streaming parser and writes
+every triple as soon as it is parsed, so memory stays bounded however
+large the graph is, unlike loading it into an rdflib Graph first. Turtle
+output groups consecutive triples of the same subject and uses the
+prefixes declared at the start of the source (plus any given ones).
+Files ending in .gz are read and written gzip-compressed; the output is
+written to a temporary file and renamed when complete.
+
+Used by enrich-geometries.py and 04-validate/validate.py; other stages add
+this directory to sys.path, as run-updates.py does for query_dag.py.
+
+Usage:
+    python rdf_convert.py output/era-graph-enriched.ttl output/era-graph-enriched.nt
+    python rdf_convert.py output/era-graph-enriched.ttl output/era-graph-enriched.nt.gz
+"""
+
+import argparse
+import gzip
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+# Optional: the streaming parser and serializer (pip install pyoxigraph)
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+GZIP_LEVEL = 6
+
+PathLike = Union[str, os.PathLike]
+
+
+def rdf_format(path: PathLike) -> "pyoxigraph.RdfFormat":
+    """
+    Guess the RDF format of a file from its extension, ignoring a .gz suffix.
+
+    Raises:
+        ValueError: If the extension is not a known RDF serialization
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        path = path.with_suffix("")
+    rdf_format = pyoxigraph.RdfFormat.from_extension(path.suffix.lstrip("."))
+    if rdf_format is None:
+        raise ValueError(f"Unknown RDF format of {path.name}")
+    return rdf_format
+
+
+def open_file(path: PathLike, mode: str, compressed: bool):
+    """Open a file in binary mode, gzip-compressed if `compressed`."""
+    if compressed:
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL)
+    return open(path, mode)
+
+
+def convert(source: PathLike, destination: PathLike,
+            prefixes: Optional[Dict[str, str]] = None) -> int:
+    """
+    Convert an RDF file to another serialization, streaming.
+
+    Named graphs of a dataset source are merged when the destination
+    format only holds triples.
+
+    Args:
+        source: Input file (format from its extension, optionally .gz)
+        destination: Output file (format from its extension, optionally .gz)
+        prefixes: Prefixes for a Turtle destination, in addition to the
+            ones declared at the start of the source
+
+    Returns:
+        Number of triples (or quads) written
+    """
+    if pyoxigraph is None:
+        raise ImportError("rdf_convert requires pyoxigraph (pip install pyoxigraph)")
+    source_format = rdf_format(source)
+    destination_format = rdf_format(destination)
+
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    partial = f"{destination}.part"
+    try:
+        with open_file(source, "rb", str(source).endswith(".gz")) as input_file, \
+                open_file(partial, "wb", str(destination).endswith(".gz")) as output_file:
+            count = stream(input_file, output_file, source_format, destination_format, prefixes)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, destination)
+    return count
+
+
+def stream(input_file, output_file, source_format: "pyoxigraph.RdfFormat",
+           destination_format: "pyoxigraph.RdfFormat", prefixes: Optional[Dict[str, str]]) -> int:
+    """Parse input_file and serialize each statement to output_file as it is read."""
+    count = 0
+    parser = pyoxigraph.parse(input=input_file, format=source_format)
+    # Read one statement first, so the prefixes of the source header are known
+    first = list(itertools.islice(parser, 1))
+    statements = itertools.chain(first, parser)
+    if not destination_format.supports_datasets:
+        statements = (quad.triple for quad in statements)
+
+    def counted(items):
+        nonlocal count
+        for count, item in enumerate(items, 1):
+            yield item
+
+    pyoxigraph.serialize(counted(statements), output_file, destination_format,
+                         prefixes={**parser.prefixes, **(prefixes or {})})
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert an RDF file to another serialization, streaming")
+    parser.add_argument("source", help="Input file, e.g. graph.ttl or graph.nt.gz")
+    parser.add_argument("destination", help="Output file, e.g. graph.nt (.gz to compress)")
+    args = parser.parse_args()
+
+    if pyoxigraph is None:
+        print("  ❌ The converter requires pyoxigraph (pip install pyoxigraph)")
+        return 1
+
+    start = time.perf_counter()
+    try:
+        count = convert(args.source, args.destination)
+    except (OSError, SyntaxError, ValueError) as e:
+        print(f"  ❌ Conversion failed: {e}")
+        return 1
+    print(f"  ✓ Converted {count} triples to {args.destination} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
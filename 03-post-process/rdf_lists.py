@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+One-pass decoding of RDF lists (rdf:first / rdf:rest chains).
+
+decode_lists() reads every rdf:first and rdf:rest link once and returns
+the ordered items of every list, keyed by the list head, so looking up a
+list is a dictionary access instead of a linked-list walk. Malformed lists
+are reported instead of looping forever:
+
+- cycle:        a rest chain that returns to a node it already visited
+- unterminated: a rest chain that ends somewhere other than rdf:nil,
+                e.g. on the dangling nodes fix-rdf-list-termination.sparql
+                repairs
+
+Nodes can be any hashable terms (rdflib terms, term ids of a triple table),
+so the same decoder serves both backends of enrich-geometries.py.
+
+Usage (report the malformed lists of a graph):
+    python rdf_lists.py ../02-construct/output/era-graph.ttl
+"""
+
+import argparse
+import sys
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+from rdflib import Graph, RDF
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+class ListIssue(NamedTuple):
+    """A malformed list: its head, the problem and the node where decoding stopped."""
+    head: Hashable
+    problem: str  # "cycle" or "unterminated"
+    node: Hashable
+
+
+class RdfLists(NamedTuple):
+    """Decoded RDF lists."""
+    items: Dict[Hashable, Tuple]  # list head -> items in order
+    positions: Dict[Hashable, Tuple[Hashable, int]]  # list node -> (head, index of its item)
+    issues: List[ListIssue]
+
+
+def decode_lists(firsts: Dict[Hashable, Hashable], rests: Dict[Hashable, Hashable],
+                 nil: Hashable) -> RdfLists:
+    """
+    Decode every list given by its rdf:first and rdf:rest links.
+
+    Heads are the list nodes that are not the rdf:rest of another node.
+    Items are collected like a plain walk would: a node without rdf:first
+    adds nothing and a node without rdf:rest ends the list. Lists that
+    are one cycle have no head; each such cycle is decoded from one of its
+    nodes.
+
+    Args:
+        firsts: rdf:first object per list node
+        rests: rdf:rest object per list node
+        nil: The rdf:nil term
+
+    Returns:
+        RdfLists with the items of every head and the position of every node
+    """
+    lists = RdfLists({}, {}, [])
+    nodes = list(dict.fromkeys([*firsts, *rests]))
+    tails = set(rests.values())
+
+    def walk(head: Hashable):
+        items = []
+        seen = set()
+        node = head
+        while node != nil:
+            if node in seen:
+                lists.issues.append(ListIssue(head, "cycle", node))
+                break
+            if node not in firsts and node not in rests:
+                # rdf:rest pointing to a node that is not a list node
+                lists.issues.append(ListIssue(head, "unterminated", node))
+                break
+            seen.add(node)
+            lists.positions.setdefault(node, (head, len(items)))
+            if node in firsts:
+                items.append(firsts[node])
+            if node not in rests:
+                # The last node of a well-formed list points to rdf:nil
+                lists.issues.append(ListIssue(head, "unterminated", node))
+                break
+            node = rests[node]
+        lists.items[head] = tuple(items)
+
+    for node in nodes:
+        if node not in tails:
+            walk(node)
+    # Nodes still unreached are only reachable from each other: pure cycles
+    for node in nodes:
+        if node not in lists.positions:
+            walk(node)
+    return lists
+
+
+def list_items(lists: RdfLists, node: Hashable) -> Tuple:
+    """Items of the list starting at `node`, a head or any node inside a list."""
+    if node not in lists.positions:
+        return ()
+    head, index = lists.positions[node]
+    return lists.items[head][index:]
+
+
+def decode_graph_lists(graph: Graph) -> RdfLists:
+    """Decode the RDF lists of an rdflib graph (the first object per node is used)."""
+    firsts: Dict[Hashable, Hashable] = {}
+    rests: Dict[Hashable, Hashable] = {}
+    for node, item in graph.subject_objects(RDF.first):
+        firsts.setdefault(node, item)
+    for node, rest in graph.subject_objects(RDF.rest):
+        rests.setdefault(node, rest)
+    return decode_lists(firsts, rests, RDF.nil)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report cyclic and unterminated RDF lists")
+    parser.add_argument("file", help="RDF file to check (Turtle or N-Triples)")
+    args = parser.parse_args()
+
+    graph = Graph()
+    graph.parse(args.file, format="turtle")
+    lists = decode_graph_lists(graph)
+
+    print(f"  Decoded {len(lists.items)} RDF lists ({len(lists.positions)} list nodes)")
+    for issue in lists.issues:
+        print(f"  ⚠️  {issue.problem} list {issue.head} (stops at {issue.node})")
+    if not lists.issues:
+        print("  ✓ All lists end in rdf:nil")
+    return 1 if lists.issues else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Run the post-processing steps on an in-process pyoxigraph store.
+
+The construct output is loaded once into the store, then:
+1. the SPARQL UPDATE files of sparql-update/ and
+3. the data fixes of data-fixes/ are applied in dependency order (the same
+   order as run-updates.py, see 02-construct/query_dag.py; the
+   infer-part-relations-* files are computed by part_relations.py), and
+2. the geometries are enriched in-process by enrich-geometries.py (tables
+   backend, reading the triples of the store),
+before the result is written once as Turtle and as N-Triples. Nothing is
+re-exported from Fuseki or re-parsed, and the offline path applies the
+updates too. When Fuseki is available the result replaces its default
+graph, so later stages querying Fuseki see the same data, unless that
+would lose or duplicate data there (see upload_conflict()).
+
+Returns 1 when an update failed, after writing the outputs.
+
+The wall time of every update is written to output/update-report-post-process.json
+and .md; with --profile also exactly what each update inserted and deleted
+(see update_stats.py). With --batch the updates of each directory are applied
+all-or-nothing and still measured one by one (see apply_batch()).
+
+Usage:
+    python run-post-process.py
+    python run-post-process.py --no-upload --simplify 10 100 1000
+    python run-post-process.py --batch --profile
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+
+import part_relations
+from update_stats import triple_delta, update_predicates, write_update_report
+
+# Optional: the embedded store (pip install pyoxigraph)
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+# The dependency scheduler is shared with the construct stage
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02-construct"))
+from query_dag import build_dependencies, topological_order  # noqa: E402
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# Configuration
+FUSEKI_URL = "http://localhost:8082/jena-fuseki/advanced-example"
+FUSEKI_QUERY = f"{FUSEKI_URL}/query"
+FUSEKI_DATA = f"{FUSEKI_URL}/data"
+INPUT_TTL = "../02-construct/output/era-graph.ttl"
+OUTPUT_TTL = "output/era-graph-enriched.ttl"
+OUTPUT_NT = "output/era-graph-enriched.nt"
+REPORT_JSON_FILE = "output/update-report-post-process.json"
+REPORT_MD_FILE = "output/update-report-post-process.md"
+ENRICH_SCRIPT = Path(__file__).resolve().parent / "enrich-geometries.py"
+
+# Named graphs written by `run-construct.py --named-graphs` (QUERY_GRAPH_BASE there)
+CONSTRUCT_GRAPH_BASE = "https://data.matdata.eu/graph/construct/"
+NAMED_GRAPHS_QUERY = f"""
+ASK {{ GRAPH ?g {{ ?s ?p ?o }} FILTER(STRSTARTS(STR(?g), "{CONSTRUCT_GRAPH_BASE}")) }}
+"""
+DEFAULT_GRAPH_COUNT_QUERY = "SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }"
+
+# Update directories with the step number of their progress labels, in run order
+UPDATE_STEPS = [(Path("sparql-update"), "1"), (Path("data-fixes"), "3")]
+
+# Prefixes of the Turtle output
+PREFIXES = {
+    "era": "http://data.europa.eu/949/",
+    "gsp": "http://www.opengis.net/ont/geosparql#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+}
+
+
+def check_fuseki() -> bool:
+    """Check if the Fuseki endpoint is available."""
+    try:
+        r = requests.post(FUSEKI_QUERY, data={"query": "ASK { }"}, timeout=5)
+        return r.status_code == 200
+    except Exception:
+        return False
+
+
+def query_fuseki(query: str) -> Dict:
+    """Run a SELECT or ASK query on Fuseki and return the JSON results."""
+    r = requests.post(FUSEKI_QUERY, data={"query": query},
+                      headers={"Accept": "application/sparql-results+json"}, timeout=300)
+    r.raise_for_status()
+    return r.json()
+
+
+def upload_conflict(input_triples: int, force: bool = False) -> Optional[str]:
+    """
+    Check whether replacing the Fuseki default graph would lose or duplicate data.
+
+    Under the named-graph layout of `run-construct.py --named-graphs` the
+    construct output is in one named graph per query, so a copy in the
+    default graph would duplicate it; the steps are then applied to Fuseki
+    by run-updates.py and enrich-geometries.py instead. Otherwise the
+    default graph should still hold what the store loaded from INPUT_TTL. A
+    different triple count means Fuseki has state the store never saw (e.g.
+    updates already applied by run-updates.py), which the upload would drop.
+
+    Args:
+        input_triples: Number of triples the store loaded from INPUT_TTL
+        force: Skip the triple count check (the named-graph check still applies)
+
+    Returns:
+        Why the upload is skipped, or None if the default graph can be replaced
+    """
+    if query_fuseki(NAMED_GRAPHS_QUERY)["boolean"]:
+        return (f"Fuseki holds the construct output in named graphs under {CONSTRUCT_GRAPH_BASE}; "
+                "run run-updates.py and enrich-geometries.py against Fuseki instead")
+    if force:
+        return None
+    bindings = query_fuseki(DEFAULT_GRAPH_COUNT_QUERY)["results"]["bindings"]
+    fuseki_triples = int(bindings[0]["n"]["value"]) if bindings else 0
+    if fuseki_triples != input_triples:
+        return (f"the Fuseki default graph has {fuseki_triples} triples, not the {input_triples} "
+                f"of {INPUT_TTL}, so it was not the source of this run (--force-upload replaces it anyway)")
+    return None
+
+
+def load_enrich_module():
+    """Import enrich-geometries.py (its file name is not a module name)."""
+    spec = importlib.util.spec_from_file_location("enrich_geometries", ENRICH_SCRIPT)
+    enrich = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(enrich)
+    return enrich
+
+
+def snapshot_triples(store: "pyoxigraph.Store",
+                     predicates: Optional[Set[str]]) -> Set[Tuple[str, str, str, str]]:
+    """
+    The store triples with the given predicates, for triple_delta() (see update_stats.py).
+
+    Args:
+        predicates: Predicate IRIs, or None for every triple of the store
+
+    Returns:
+        Set of (subject, predicate, object, object kind) tuples
+    """
+    patterns = [None] if predicates is None else [pyoxigraph.NamedNode(p) for p in predicates]
+    triples = set()
+    for pattern in patterns:
+        for quad in store.quads_for_pattern(None, pattern, None):
+            o = quad.object
+            if isinstance(o, pyoxigraph.Literal):
+                kind = o.datatype.value
+            else:
+                kind = "IRI" if isinstance(o, pyoxigraph.NamedNode) else "blank node"
+            triples.add((str(quad.subject), quad.predicate.value, str(o), kind))
+    return triples
+
+
+def apply_updates(store: "pyoxigraph.Store", directory: Path, step: str, report: List[Dict],
+                  native: bool = True, profile: bool = False, stop_on_failure: bool = False) -> int:
+    """
+    Apply the SPARQL UPDATE files of a directory to the store in dependency order.
+
+    A failing update is reported and skipped (each update is a transaction,
+    so it leaves the store unchanged), as run-updates.py does against Fuseki.
+    With `native`, the files in part_relations.RULES are computed by its
+    interval-index engine instead of being executed. One report row per
+    update is appended to `report`; with `profile` it includes the
+    inserted and deleted triples. With `stop_on_failure`, the updates after
+    a failing one are not run.
+
+    Returns:
+        Number of failed updates
+    """
+    files = sorted(directory.glob("*.sparql"))
+    if not files:
+        print(f"  No SPARQL files found in {directory}")
+        return 0
+
+    try:
+        order = topological_order(files, build_dependencies(files))
+    except ValueError as e:
+        print(f"  ❌ Invalid update dependencies: {e}")
+        return len(files)
+
+    failed = 0
+    for i, f in enumerate(order):
+        label = f"{step}.{chr(97 + i)}"
+        print(f"  Step {label}: Processing {f.name}...")
+        update = f.read_text(encoding="utf-8-sig")
+        if not update.strip():
+            print("    ⚠️  Skipped (file is empty)")
+            continue
+        before = len(store)
+        # Only the predicates the update writes can change
+        predicates = update_predicates(update) if profile else None
+        snapshot = snapshot_triples(store, predicates) if profile else None
+        start = time.perf_counter()
+        try:
+            if native and f.name in part_relations.RULES:
+                pairs = part_relations.apply_rule(store, f.name)
+                how = f"Computed {pairs} part relations (part_relations.py)"
+            else:
+                store.update(update)
+                how = "Executed"
+            success = True
+        except Exception as e:
+            print(f"    ⚠️  WARNING: Execution failed: {e}")
+            failed += 1
+            success = False
+        stats = {"step": label, "update": f.name, "success": success,
+                 "wall_s": time.perf_counter() - start}
+        report.append(stats)
+        if not success:
+            if stop_on_failure:
+                break
+            continue
+        if profile:
+            stats.update(triple_delta(snapshot, snapshot_triples(store, predicates)))
+            change = f"+{stats['inserted']} / -{stats['deleted']} triples"
+        else:
+            change = f"{len(store) - before:+d} triples"
+        print(f"    ✓ {how} in {stats['wall_s']:.2f}s ({change})")
+    return failed
+
+
+def apply_batch(store: "pyoxigraph.Store", directory: Path, step: str, report: List[Dict],
+                native: bool = True, profile: bool = False) -> Tuple["pyoxigraph.Store", int]:
+    """
+    Apply the SPARQL UPDATE files of a directory all-or-nothing.
+
+    The embedded store has no transaction spanning several updates, so they
+    are applied by apply_updates() to a staging copy of the store, which
+    keeps one report row per update (timed and, with `profile`, counted
+    one by one) at the cost of holding the graph twice. The copy replaces
+    the store only if every update succeeded. Otherwise it is discarded,
+    the store is left as it was, and the rows of the updates applied before
+    the failure are marked as rolled back.
+
+    Returns:
+        Tuple of (the store to continue with, number of updates not applied)
+    """
+    staging = pyoxigraph.Store()
+    staging.bulk_extend(store)
+    rows: List[Dict] = []
+    failed = apply_updates(staging, directory, step, rows, native, profile, stop_on_failure=True)
+    report.extend(rows)
+    if not failed:
+        return staging, 0
+    for row in rows:
+        if row["success"]:
+            row["rolled_back"] = True
+    print(f"  ❌ Batch rolled back, {directory} left the store unchanged")
+    return store, len(list(directory.glob("*.sparql")))
+
+
+def write_outputs(store: "pyoxigraph.Store") -> Tuple[str, str]:
+    """Write the default graph of the store as Turtle and as N-Triples."""
+    os.makedirs(os.path.dirname(OUTPUT_TTL) or ".", exist_ok=True)
+    graph = pyoxigraph.DefaultGraph()
+    store.dump(OUTPUT_TTL, pyoxigraph.RdfFormat.TURTLE, from_graph=graph, prefixes=PREFIXES)
+    store.dump(OUTPUT_NT, pyoxigraph.RdfFormat.N_TRIPLES, from_graph=graph)
+    return OUTPUT_TTL, OUTPUT_NT
+
+
+def upload_to_fuseki(ntriples_file: str):
+    """Replace the Fuseki default graph with the N-Triples file (Graph Store Protocol PUT)."""
+    with open(ntriples_file, "rb") as f:
+        r = requests.put(
+            FUSEKI_DATA,
+            params={"default": ""},
+            data=f,
+            headers={"Content-Type": "application/n-triples"},
+            timeout=600,
+        )
+    r.raise_for_status()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the post-processing steps on an in-process store")
+    parser.add_argument("--no-upload", action="store_true",
+                        help="Do not replace the Fuseki graph with the result, even if Fuseki is available")
+    parser.add_argument("--wkt-precision", type=int, default=None, metavar="DECIMALS",
+                        help="Passed to enrich-geometries.py (decimals of new WKT literals)")
+    parser.add_argument("--simplify", type=float, nargs="+", default=[], metavar="METERS",
+                        help="Passed to enrich-geometries.py (simplified subject geometry resolutions)")
+    parser.add_argument("--sparql-part-relations", action="store_true",
+                        help="Execute the infer-part-relations-* updates as SPARQL instead of "
+                             "computing them with part_relations.py")
+    parser.add_argument("--profile", action="store_true",
+                        help="Compare the triples of the predicates each update writes before and "
+                             "after it, to report exactly what it inserted and deleted")
+    parser.add_argument("--batch", action="store_true",
+                        help="Apply the updates of each directory all-or-nothing, on a staging copy "
+                             "of the store (twice the memory); the report still has one row per update")
+    parser.add_argument("--force-upload", action="store_true",
+                        help="Replace the Fuseki default graph even if its triple count differs "
+                             "from the input (never under the named-graph layout)")
+    args = parser.parse_args()
+    if any(resolution <= 0 for resolution in args.simplify):
+        parser.error("--simplify resolutions must be positive")
+
+    if pyoxigraph is None:
+        print("  ❌ The post-process runner requires pyoxigraph (pip install pyoxigraph)")
+        return 1
+    enrich = load_enrich_module()
+    if enrich.pl is None:
+        print("  ❌ The geometry enrichment requires polars (pip install polars)")
+        return 1
+    enrich.WKT_PRECISION = args.wkt_precision
+    enrich.SIMPLIFY_RESOLUTIONS = sorted(set(args.simplify))
+
+    print(f"Loading {INPUT_TTL} into the embedded store...")
+    start = time.perf_counter()
+    store = pyoxigraph.Store()
+    store.bulk_load(path=INPUT_TTL, format=pyoxigraph.RdfFormat.TURTLE)
+    input_triples = len(store)
+    print(f"  ✓ Loaded {input_triples} triples in {time.perf_counter() - start:.1f}s")
+    print()
+
+    failed = 0
+    report = []
+    start = time.perf_counter()
+    for directory, step in UPDATE_STEPS:
+        if not directory.exists():
+            print(f"Step {step}: Update directory not found ({directory})")
+            print()
+            continue
+        print(f"Step {step}: Applying SPARQL UPDATE queries from {directory}...")
+        if args.batch:
+            store, batch_failed = apply_batch(store, directory, step, report,
+                                              native=not args.sparql_part_relations, profile=args.profile)
+            failed += batch_failed
+        else:
+            failed += apply_updates(store, directory, step, report,
+                                    native=not args.sparql_part_relations, profile=args.profile)
+        print()
+    if args.batch:
+        mode = "embedded store, one all-or-nothing batch per directory (staging copy), per-update rows"
+    else:
+        mode = "embedded store, one transaction per update"
+    if args.profile:
+        mode += ", profiled"
+    write_update_report(report, time.perf_counter() - start, mode, REPORT_JSON_FILE, REPORT_MD_FILE)
+    print(f"📊 Update report saved to {REPORT_JSON_FILE} and {REPORT_MD_FILE}")
+    print()
+
+    print("Step 2: Enriching geometries using linear referencing...")
+    table = enrich.build_triple_table(store.quads_for_pattern(None, None, None, pyoxigraph.DefaultGraph()))
+    new_lines = enrich.enrich_triple_table(table)
+    store.bulk_load(input="".join(f"{line}\n" for line in new_lines).encode("utf-8"),
+                    format=pyoxigraph.RdfFormat.N_TRIPLES)
+    print(f"  {len(new_lines)} new triples, {len(store)} total triples")
+    print()
+
+    print("Step 4: Writing output...")
+    for path in write_outputs(store):
+        print(f"  ✓ Saved to {path}")
+
+    if not args.no_upload and check_fuseki():
+        try:
+            conflict = upload_conflict(input_triples, force=args.force_upload)
+            if conflict:
+                print(f"  ⚠️  Not replacing the Fuseki graph: {conflict}")
+            else:
+                print("  Replacing the Fuseki graph with the result...")
+                upload_to_fuseki(OUTPUT_NT)
+                print(f"  ✓ Uploaded to {FUSEKI_URL}")
+        except Exception as e:
+            print(f"  ⚠️  WARNING: Failed to upload to Fuseki: {e}")
+    print()
+
+    if failed:
+        print(f"❌ {failed} update(s) failed, see the warnings above")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
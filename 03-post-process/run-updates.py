@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Execute the SPARQL UPDATE files of a directory against the Fuseki endpoint.
+
+Files run in dependency order: a file's `# depends-on:` header lists the
+updates that must have been applied before it (see 02-construct/query_dag.py),
+other files keep their alphanumeric order. With --jobs N, updates whose
+dependencies have finished are sent concurrently.
+
+With --batch, the ordered updates are sent as one `;`-joined request, which
+Fuseki applies as a single transaction: all of them or none. The report
+then has a single row with the totals of the batch; Fuseki cannot time or
+count the updates inside one request (run-post-process.py --batch can, on
+the embedded store). With --profile, the triples per predicate and object
+kind are counted before and after every update (see update_stats.py), so
+the report shows the net triples each update inserted and deleted (a
+one-for-one replacement is not counted; run-post-process.py --profile
+reports exact changes); updates then run one at a time.
+
+The wall time of every update is written to output/update-report-<dir>.json
+and .md.
+
+Usage:
+    python run-updates.py sparql-update --step 1
+    python run-updates.py data-fixes --step 3
+    python run-updates.py sparql-update --step 1 --profile
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from update_stats import COUNT_QUERY, Counts, count_delta, parse_counts, write_update_report
+
+# The dependency scheduler is shared with the construct stage
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "02-construct"))
+from query_dag import build_dependencies, run_dag, topological_order  # noqa: E402
+
+# Ensure UTF-8 encoding for Windows console
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except AttributeError:
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# Configuration
+FUSEKI_URL = "http://localhost:8082/jena-fuseki/advanced-example"
+FUSEKI_QUERY = f"{FUSEKI_URL}/query"
+FUSEKI_UPDATE = f"{FUSEKI_URL}/update"
+REPORT_FILE_PATTERN = "output/update-report-{name}.{ext}"
+
+# One PREFIX or BASE declaration on a header line of an update file
+DECLARATION_PATTERN = re.compile(
+    r"(?:PREFIX\s+([A-Za-z][\w.-]*)?:\s*<([^>]*)>|BASE\s*<([^>]*)>)\s*(?:#.*)?", re.IGNORECASE)
+
+
+def check_fuseki() -> bool:
+    """Check if the Fuseki endpoint is available."""
+    try:
+        r = requests.post(FUSEKI_QUERY, data={"query": "ASK { }"}, timeout=5)
+        return r.status_code == 200
+    except Exception:
+        return False
+
+
+def count_triples() -> Counts:
+    """Count the Fuseki triples per predicate and object kind (see update_stats.py)."""
+    r = requests.post(FUSEKI_QUERY, data={"query": COUNT_QUERY},
+                      headers={"Accept": "application/sparql-results+json"}, timeout=300)
+    r.raise_for_status()
+    rows = r.json()["results"]["bindings"]
+    return parse_counts((row["p"]["value"], row["kind"]["value"], row["n"]["value"]) for row in rows)
+
+
+def read_update(file_path: Path) -> str:
+    """The update text of a file, without a trailing `;` so that updates can be joined."""
+    return file_path.read_text(encoding="utf-8-sig").strip().rstrip(";").rstrip()
+
+
+def join_updates(updates: List[str]) -> str:
+    """
+    Join updates into one request with a single prologue.
+
+    The PREFIX/BASE declarations of the update headers are merged in front
+    instead of being repeated after each `;`, which not every SPARQL
+    engine accepts. The `;` goes on its own line, as an update may end
+    with a comment.
+
+    Raises:
+        ValueError: If two updates declare the same prefix (or BASE) differently
+    """
+    declarations: Dict[str, str] = {}
+    bodies = []
+    for update in updates:
+        lines = update.splitlines()
+        body_start = 0
+        for body_start, line in enumerate(lines):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            match = DECLARATION_PATTERN.fullmatch(line)
+            if not match:
+                break
+            if match.group(3) is None:
+                key, iri = f"PREFIX {match.group(1) or ''}:", match.group(2)
+            else:
+                key, iri = "BASE", match.group(3)
+            if declarations.setdefault(key, iri) != iri:
+                raise ValueError(f"conflicting declarations: {key} <{declarations[key]}> and <{iri}>")
+        else:
+            body_start = len(lines)
+        bodies.append("\n".join(lines[body_start:]))
+    prologue = "".join(f"{key} <{iri}>\n" for key, iri in declarations.items())
+    return prologue + "\n;\n".join(bodies)
+
+
+def send_update(update: str) -> Tuple[bool, str]:
+    """
+    Send one SPARQL UPDATE request to Fuseki.
+
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    try:
+        r = requests.post(FUSEKI_UPDATE, data={"update": update}, timeout=300)
+        r.raise_for_status()
+        return True, "✓ Executed successfully"
+    except Exception as e:
+        return False, f"⚠️  WARNING: Execution failed: {e}"
+
+
+def execute_update(file_path: Path, profile: bool = False) -> Tuple[bool, str, Optional[Dict]]:
+    """
+    Send one SPARQL UPDATE file to Fuseki.
+
+    Returns:
+        Tuple of (success: bool, message: str, stats: report row or None if skipped)
+    """
+    update = read_update(file_path)
+    if not update:
+        return True, "⚠️  Skipped (file is empty)", None
+    before = count_triples() if profile else None
+    start = time.perf_counter()
+    success, message = send_update(update)
+    stats = {"update": file_path.name, "success": success, "wall_s": time.perf_counter() - start}
+    if profile and success:
+        stats.update(count_delta(before, count_triples()))
+        message += f" in {stats['wall_s']:.2f}s (+{stats['inserted']} / -{stats['deleted']} triples)"
+    return success, message, stats
+
+
+def execute_batch(files: List[Path], profile: bool = False) -> Tuple[bool, str, Dict]:
+    """
+    Send the updates of `files` as one `;`-joined request (one Fuseki transaction).
+
+    Returns:
+        Tuple of (success: bool, message: str, stats: report row of the batch)
+    """
+    updates = [u for u in (read_update(f) for f in files) if u]
+    try:
+        batch = join_updates(updates)
+    except ValueError as e:
+        return False, f"⚠️  WARNING: Cannot batch the updates: {e}", {
+            "update": f"batch of {len(updates)} updates", "success": False, "wall_s": None}
+    before = count_triples() if profile else None
+    start = time.perf_counter()
+    success, message = send_update(batch)
+    stats = {"update": f"batch of {len(updates)} updates", "success": success,
+             "wall_s": time.perf_counter() - start}
+    if profile and success:
+        stats.update(count_delta(before, count_triples()))
+        message += f" (+{stats['inserted']} / -{stats['deleted']} triples)"
+    return success, f"{message} in {stats['wall_s']:.2f}s", stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Execute SPARQL UPDATE files in dependency order")
+    parser.add_argument("directory", type=Path, help="Directory containing .sparql update files")
+    parser.add_argument("--step", default="1", help="Step number used in the progress labels")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of independent updates to send concurrently (default: 1)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Send all updates as one request, applied by Fuseki as a single transaction "
+                             "(the report then only has the totals of the batch)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Count the triples per predicate before and after each update to report "
+                             "what it inserted and deleted (runs the updates one at a time)")
+    args = parser.parse_args()
+
+    files = sorted(args.directory.glob("*.sparql"))
+    if not files:
+        print(f"  No SPARQL files found in {args.directory}")
+        return 0
+
+    try:
+        dependencies = build_dependencies(files)
+        order = topological_order(files, dependencies)
+    except ValueError as e:
+        print(f"  ❌ Invalid update dependencies: {e}")
+        return 1
+
+    print(f"  Found {len(files)} SPARQL file(s)")
+    for f in order:
+        if dependencies[f]:
+            print(f"    {f.name} runs after: {', '.join(d.name for d in dependencies[f])}")
+    print()
+
+    # Label the files in execution order, as the PowerShell runner did
+    labels = {f: f"{args.step}.{chr(97 + i)}" for i, f in enumerate(order)}
+
+    if not check_fuseki():
+        for f in order:
+            print(f"  Step {labels[f]}: Processing {f.name}...")
+            print("    ⚠️  Skipped (Fuseki not available)")
+        return 0
+
+    start = time.perf_counter()
+    report = []
+    if args.batch:
+        print(f"  Step {args.step}: Sending {len(order)} updates as one transaction...")
+        success, message, stats = execute_batch(order, args.profile)
+        print(f"    {message}")
+        failed = 0 if success else len(order)
+        report.append({"step": args.step, **stats})
+        mode = "batch (one transaction), totals only: run without --batch for per-update rows"
+    else:
+        jobs = 1 if args.profile else args.jobs
+        failed = 0
+        for f, (success, message, stats) in run_dag(order, dependencies,
+                                                     lambda f: execute_update(f, args.profile), jobs):
+            print(f"  Step {labels[f]}: Processing {f.name}...")
+            print(f"    {message}")
+            if not success:
+                failed += 1
+            if stats:
+                report.append({"step": labels[f], **stats})
+        mode = f"one request per update, {jobs} job(s)"
+    if args.profile:
+        mode += ", profiled"
+
+    report_files = [REPORT_FILE_PATTERN.format(name=args.directory.name, ext=ext) for ext in ("json", "md")]
+    write_update_report(report, time.perf_counter() - start, mode, *report_files)
+    print(f"  📊 Update report saved to {report_files[0]} and {report_files[1]}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
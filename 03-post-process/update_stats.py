@@ -0,0 +1,210 @@
+"""
+Per-update statistics of the post-process SPARQL updates.
+
+On Fuseki, the change an update makes is measured by counting the triples
+per predicate and object kind (IRI, blank node or literal datatype) before
+and after it with COUNT_QUERY. Counts that grow are reported as inserted
+triples, counts that shrink as deleted ones, so a datatype fix shows up as
+both. An update that replaces values without changing any count (same
+predicate, same datatype) cannot be told apart from a no-op this way, so
+such rows are labelled "net +0/-0" rather than as unchanged.
+
+On the embedded store the change is exact: the triples of the predicates
+an update writes (see update_predicates()) are compared before and after
+it (see triple_delta()), so a one-for-one replacement counts as inserted
+and deleted.
+
+Used by run-updates.py (Fuseki) and run-post-process.py (embedded store),
+which write the report with write_update_report().
+"""
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Triples per predicate and object kind
+COUNT_QUERY = """
+SELECT ?p ?kind (COUNT(*) AS ?n) WHERE {
+  ?s ?p ?o .
+  BIND(IF(isLiteral(?o), STR(DATATYPE(?o)), IF(isIRI(?o), "IRI", "blank node")) AS ?kind)
+}
+GROUP BY ?p ?kind
+"""
+
+Counts = Dict[Tuple[str, str], int]
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+# Tokens of an update: strings, IRIs, comments, variables, prefixed names,
+# language tags, words and punctuation
+UPDATE_TOKEN_PATTERN = re.compile(
+    r'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+    r'|<[^<>"{}|^`\\\x00-\x20]*>|#[^\n]*|[?$]\w+|@[A-Za-z][\w-]*|\^\^'
+    r'|(?:[A-Za-z][\w-]*)?:[\w%-]*(?:\.[\w%-]+)*|[\w+-]+(?:\.\w+)*|[{}()\[\].;,]')
+PREFIX_PATTERN = re.compile(r"PREFIX\s+([A-Za-z][\w.-]*)?:\s*<([^>]*)>", re.IGNORECASE)
+
+
+def parse_counts(rows: Iterable[Tuple[str, str, str]]) -> Counts:
+    """Counts keyed by (predicate, object kind) from (p, kind, n) result rows."""
+    return {(p, kind): int(n) for p, kind, n in rows}
+
+
+def count_delta(before: Counts, after: Counts) -> Dict:
+    """
+    Compare the counts before and after an update.
+
+    Returns:
+        Dict with the inserted and deleted triple totals and the per-key
+        changes ("<predicate> <kind>" -> signed difference)
+    """
+    changes = {}
+    for key in sorted(set(before) | set(after)):
+        difference = after.get(key, 0) - before.get(key, 0)
+        if difference:
+            changes[f"<{key[0]}> {key[1]}"] = difference
+    return {
+        "inserted": sum(d for d in changes.values() if d > 0),
+        "deleted": -sum(d for d in changes.values() if d < 0),
+        "changes": changes,
+    }
+
+
+def update_templates(tokens: List[str]) -> Optional[List[List[str]]]:
+    """The tokens inside the DELETE and INSERT templates of an update, or None if it has none."""
+    templates = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i].upper() in ("INSERT", "DELETE"):
+            i += 1
+            if i < len(tokens) and tokens[i].upper() in ("DATA", "WHERE"):
+                i += 1
+            if i >= len(tokens) or tokens[i] != "{":
+                return None
+            depth, start = 0, i + 1
+            for i in range(i, len(tokens)):
+                depth += {"{": 1, "}": -1}.get(tokens[i], 0)
+                if depth == 0:
+                    break
+            templates.append(tokens[start:i])
+        i += 1
+    return templates or None
+
+
+def update_predicates(update: str) -> Optional[Set[str]]:
+    """
+    The predicate IRIs an update can insert or delete, read from its templates.
+
+    Returns:
+        The IRIs, or None if they cannot be known from the text: a template
+        has a variable predicate, blank node brackets, a collection or a
+        GRAPH block, an unknown prefix, or the update has no template
+        (e.g. CLEAR or LOAD)
+    """
+    prefixes = {prefix or "": iri for prefix, iri in PREFIX_PATTERN.findall(update)}
+    tokens = [t for t in UPDATE_TOKEN_PATTERN.findall(update) if not t.startswith("#")]
+    templates = update_templates(tokens)
+    if templates is None:
+        return None
+
+    predicates = set()
+    for template in templates:
+        # Position in the triple: 0 subject, 1 predicate, 2 object
+        position = 0
+        for i, token in enumerate(template):
+            if token in ("[", "]", "(", ")") or token.upper() == "GRAPH":
+                return None
+            if token == ".":
+                position = 0
+            elif token == ";":
+                position = 1
+            elif token == ",":
+                position = 2
+            elif token == "^^" or token.startswith("@") or (i and template[i - 1] == "^^"):
+                continue
+            else:
+                if position == 1:
+                    if token == "a":
+                        predicates.add(RDF_TYPE)
+                    elif token.startswith("<"):
+                        predicates.add(token[1:-1])
+                    elif ":" in token and token.split(":", 1)[0] in prefixes:
+                        prefix, local = token.split(":", 1)
+                        predicates.add(prefixes[prefix] + local)
+                    else:
+                        return None
+                position = min(position + 1, 2)
+    return predicates
+
+
+def triple_delta(before: Set[Tuple[str, str, str, str]], after: Set[Tuple[str, str, str, str]]) -> Dict:
+    """
+    Compare the triples before and after an update exactly.
+
+    Args:
+        before: (subject, predicate, object, object kind) tuples before the update
+        after: The same after the update
+
+    Returns:
+        Dict like count_delta(), with exact inserted and deleted totals and
+        the per-key changes ("<predicate> <kind>" -> "+inserted/-deleted")
+    """
+    inserted: Dict[Tuple[str, str], int] = {}
+    deleted: Dict[Tuple[str, str], int] = {}
+    for triples, changed in ((after - before, inserted), (before - after, deleted)):
+        for _, p, _, kind in triples:
+            changed[(p, kind)] = changed.get((p, kind), 0) + 1
+    changes = {f"<{key[0]}> {key[1]}": f"+{inserted.get(key, 0)}/-{deleted.get(key, 0)}"
+               for key in sorted(set(inserted) | set(deleted))}
+    return {
+        "inserted": sum(inserted.values()),
+        "deleted": sum(deleted.values()),
+        "changes": changes,
+        "exact": True,
+    }
+
+
+def write_update_report(stats: List[Dict], total_seconds: float, mode: str,
+                        json_file: str, md_file: str):
+    """
+    Write the per-update report as JSON and as a markdown table.
+
+    Args:
+        stats: One dict per update with update, step, success, wall_s and,
+            when profiled, inserted, deleted, changes and exact (see
+            triple_delta()); rolled_back marks an update undone because a
+            later one of its batch failed
+        total_seconds: Wall time of all updates
+        mode: How the updates ran (shown in the report)
+    """
+    report = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "mode": mode,
+        "total_s": total_seconds,
+        "updates": stats,
+    }
+    Path(json_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    def fmt(value: Optional[float]) -> str:
+        return "" if value is None else f"{value:.3f}"
+
+    with open(md_file, "w", encoding="utf-8") as f:
+        f.write("# SPARQL Update Report\n\n")
+        f.write(f"**Date:** {report['date']}\n\n")
+        f.write(f"**Mode:** {mode}\n\n")
+        f.write(f"**Total:** {total_seconds:.2f}s\n\n")
+        f.write("| Step | Update | Status | Wall (s) | Inserted | Deleted | Changes |\n")
+        f.write("|------|--------|--------|----------|----------|---------|---------|\n")
+        for row in sorted(stats, key=lambda row: -(row.get("wall_s") or 0.0)):
+            status = "ok" if row["success"] else "failed"
+            if row["success"] and row.get("inserted") == 0 and row.get("deleted") == 0:
+                status = "no change" if row.get("exact") else "net +0/-0 (replacements not counted)"
+            if row.get("rolled_back"):
+                status = "rolled back"
+            changes = "; ".join(f"{key} {d:+d}" if isinstance(d, int) else f"{key} {d}"
+                                for key, d in row.get("changes", {}).items())
+            f.write(f"| {row['step']} | `{row['update']}` | {status} | {fmt(row.get('wall_s'))} | "
+                    f"{row.get('inserted', '')} | {row.get('deleted', '')} | {changes} |\n")
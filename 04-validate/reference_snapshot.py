@@ -0,0 +1,200 @@
+"""
+Snapshot cache of the reference data of the validation.
+
+The ERA ontology, the SKOS concept schemes and the ERA RINF shapes are the
+same on most runs, but parsing them (and filtering the shapes) took longer
+than validating the data itself. reference_snapshot() builds them once
+into two sorted N-Triples files:
+- ontology.nt: the ontology merged with every SKOS file
+- shapes.nt: the shapes without unimplemented GeoSPARQL constraints and
+  with the shape-fixes/ updates applied
+and records in manifest.json a key hashed from the contents of every
+source file. Later runs whose sources hash to the same key load the
+snapshot files directly; any changed, added or removed source rebuilds it.
+
+Used by validate.py (maplib) and validate-pyshacl.py (rdflib).
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import rdflib
+
+# Bump when the way the snapshot is built changes, to invalidate old snapshots
+SNAPSHOT_VERSION = 1
+MANIFEST = "manifest.json"
+
+SH = rdflib.Namespace("http://www.w3.org/ns/shacl#")
+
+# SPARQL constraints using these GeoSPARQL functions are removed from the shapes
+UNIMPLEMENTED_FUNCTIONS = [
+    "http://www.opengis.net/def/function/geosparql/distance",
+    "http://www.opengis.net/def/function/geosparql/sfContains",
+    "http://www.opengis.net/def/function/geosparql/sfWithin",
+    # Prefix forms as they appear in Turtle files
+    "geof:distance",
+    "geof:sfContains",
+    "geof:sfWithin",
+]
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_key(sources: Dict[str, List[Path]]) -> Tuple[str, Dict[str, Dict[str, str]]]:
+    """
+    Hash the source files of the snapshot.
+
+    Args:
+        sources: Source files per role ("ontology", "skos", "shapes", "fixes")
+
+    Returns:
+        The snapshot key and the per-role file digests (for the manifest)
+    """
+    digests = {role: {Path(f).name: file_digest(f) for f in sorted(files)}
+               for role, files in sources.items()}
+    key = json.dumps({"version": SNAPSHOT_VERSION, "sources": digests,
+                      "unimplemented_functions": UNIMPLEMENTED_FUNCTIONS}, sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest(), digests
+
+
+def build_ontology_graph(ontology_file: Path, skos_files: List[Path]) -> Tuple[rdflib.Graph, int]:
+    """
+    Merge the ERA ontology and the SKOS files into one graph.
+
+    Returns:
+        The graph and the number of files that failed to parse
+    """
+    graph = rdflib.Graph()
+    failed = 0
+    print("  Loading ERA ontology...")
+    try:
+        graph.parse(str(ontology_file), format="turtle")
+        print(f"    ✓ Loaded ontology ({len(graph)} triples)")
+    except Exception as e:
+        print(f"    ⚠️  Warning: Failed to load ontology: {e}")
+        failed += 1
+
+    if skos_files:
+        print(f"  Merging {len(skos_files)} SKOS files...")
+        for skos_file in skos_files:
+            print(f"    ... Merging {skos_file.name}")
+            try:
+                graph.parse(str(skos_file), format="turtle")
+            except Exception as e:
+                print(f"    ⚠️  Warning: Failed to merge {skos_file.name}: {e}")
+                failed += 1
+        print(f"  Ontology graph: {len(graph)} triples total")
+    return graph, failed
+
+
+def build_shapes_graph(shapes_file: Path, fix_files: List[Path]) -> rdflib.Graph:
+    """Load the shapes, remove unimplemented GeoSPARQL constraints and apply the shape fixes."""
+    print("Filtering SHACL shapes to remove unsupported GeoSPARQL functions...")
+    shapes_graph = rdflib.Graph()
+    shapes_graph.parse(str(shapes_file), format="turtle")
+
+    removed_count = 0
+    for constraint in list(shapes_graph.subjects(rdflib.RDF.type, SH.SPARQLConstraint)):
+        for select_query in shapes_graph.objects(constraint, SH.select):
+            query_text = str(select_query)
+            if any(func in query_text for func in UNIMPLEMENTED_FUNCTIONS):
+                # Remove this constraint component
+                for triple in list(shapes_graph.triples((constraint, None, None))):
+                    shapes_graph.remove(triple)
+                # Also remove references to this constraint
+                for s, p, o in list(shapes_graph.triples((None, None, constraint))):
+                    shapes_graph.remove((s, p, o))
+                removed_count += 1
+                print("  Removed SPARQL constraint using GeoSPARQL function")
+                break
+    print(f"Removed {removed_count} constraint(s) with unimplemented GeoSPARQL functions")
+
+    if fix_files:
+        print(f"\nApplying {len(fix_files)} shape fix(es)...")
+        for fix_file in fix_files:
+            print(f"  Applying fix: {fix_file.name}")
+            shapes_graph.update(fix_file.read_text(encoding='utf-8'))
+        print("Shape fixes applied successfully")
+    else:
+        print("\nNo shape fixes found in shape-fixes directory")
+    return shapes_graph
+
+
+def write_sorted_ntriples(graph: rdflib.Graph, path: Path) -> int:
+    """Write a graph as sorted N-Triples (stable across runs apart from blank node labels)."""
+    lines = sorted(line for line in graph.serialize(format="nt").splitlines() if line)
+    partial = path.with_name(path.name + ".part")
+    with open(partial, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(f"{line}\n" for line in lines)
+    os.replace(partial, path)
+    return len(lines)
+
+
+def load_manifest(snapshot_dir: Path) -> Optional[Dict]:
+    """The manifest of the snapshot in snapshot_dir, or None if absent or unreadable."""
+    try:
+        with open(snapshot_dir / MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def reference_snapshot(snapshot_dir: Path, ontology_file: Path, skos_files: List[Path],
+                       shapes_file: Path, fix_files: List[Path]) -> Dict[str, Path]:
+    """
+    Return the snapshot files of the reference data, building them if stale.
+
+    The snapshot is reused when the key of its manifest matches the current
+    source files and its files exist. A snapshot is not saved when an
+    ontology or SKOS file failed to parse, so the next run tries again.
+
+    Args:
+        snapshot_dir: Directory of the snapshot (created if needed)
+        ontology_file: ERA ontology Turtle file
+        skos_files: SKOS Turtle files
+        shapes_file: ERA RINF shapes Turtle file
+        fix_files: SPARQL UPDATE files applied to the shapes
+
+    Returns:
+        Dict with the "ontology" and "shapes" N-Triples paths
+    """
+    paths = {"ontology": snapshot_dir / "ontology.nt", "shapes": snapshot_dir / "shapes.nt"}
+    sources = {"ontology": [ontology_file] if ontology_file.exists() else [],
+               "skos": list(skos_files), "shapes": [shapes_file], "fixes": list(fix_files)}
+    key, digests = snapshot_key(sources)
+
+    manifest = load_manifest(snapshot_dir)
+    if manifest and manifest.get("key") == key and all(p.exists() for p in paths.values()):
+        counts = manifest.get("triples", {})
+        print(f"  ✓ Reference snapshot is up to date ({counts.get('ontology')} ontology and "
+              f"{counts.get('shapes')} shape triples, built {manifest.get('created')})")
+        return paths
+
+    print("  Building reference snapshot (sources changed or no snapshot yet)...")
+    ontology_graph, failed = build_ontology_graph(ontology_file, list(skos_files))
+    shapes_graph = build_shapes_graph(shapes_file, list(fix_files))
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    counts = {name: write_sorted_ntriples(graph, paths[name])
+              for name, graph in (("ontology", ontology_graph), ("shapes", shapes_graph))}
+    if failed:
+        print(f"  ⚠️  Warning: {failed} reference file(s) failed to load, snapshot not cached")
+        (snapshot_dir / MANIFEST).unlink(missing_ok=True)
+        return paths
+
+    with open(snapshot_dir / MANIFEST, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "created": datetime.now().isoformat(timespec="seconds"),
+                   "triples": counts, "sources": digests}, f, indent=2)
+    print(f"  ✓ Reference snapshot saved to {snapshot_dir}")
+    return paths
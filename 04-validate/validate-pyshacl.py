@@ -1,17 +1,19 @@
 import time
 import pyshacl
-import rdflib
 from rdflib import Graph
 import urllib.request
 import requests
 from pathlib import Path
 from datetime import datetime
 
+from reference_snapshot import reference_snapshot
+
 # Define paths
 data_file = Path("../03-post-process/output/era-graph-enriched.ttl")
 download_dir = Path("downloads")
 download_dir.mkdir(exist_ok=True)
 shape_fixes_dir = Path("shape-fixes")
+snapshot_dir = download_dir / "snapshot"
 output_dir = Path("output-pyshacl")
 output_dir.mkdir(exist_ok=True)
 
@@ -94,85 +96,26 @@ except Exception as e:
     print("     Validation may be incomplete")
 
 
-# Build ontology graph (ontology + SKOS) for pyshacl inference
+# Build or reuse the parsed reference data (ontology + SKOS, filtered shapes),
+# see reference_snapshot.py
+print("\nPreparing reference data...")
+fix_files = sorted(shape_fixes_dir.glob("*.sparql")) if shape_fixes_dir.exists() else []
+_t0 = time.perf_counter()
+snapshot = reference_snapshot(snapshot_dir, era_ontology_file, skos_files, era_rinf_shapes_file, fix_files)
+
+# Ontology graph (ontology + SKOS) for pyshacl inference
 ont_graph = Graph()
-print("  Loading ERA ontology...")
-try:
-    ont_graph.parse(str(era_ontology_file), format="turtle")
-    print(f"    ✓ Loaded ontology ({len(ont_graph)} triples)")
-except Exception as e:
-    print(f"    ⚠️  Warning: Failed to load ontology: {e}")
+ont_graph.parse(str(snapshot["ontology"]), format="nt")
+print(f"  Ontology graph: {len(ont_graph)} triples total")
 
-# Load SKOS files into ontology graph
-if skos_files:
-    print(f"  Loading {len(skos_files)} SKOS files into ontology graph...")
-    for skos_file in skos_files:
-        print(f"    ... Loading {skos_file.name}")
-        try:
-            ont_graph.parse(str(skos_file), format="turtle")
-        except Exception as e:
-            print(f"    ⚠️  Warning: Failed to load {skos_file.name}: {e}")
-    print(f"  Ontology graph: {len(ont_graph)} triples total")
+shapes_graph = Graph()
+shapes_graph.parse(str(snapshot["shapes"]), format="nt")
+print(f"  Shapes graph: {len(shapes_graph)} triples")
+print(f"Reference data ready in {time.perf_counter() - _t0:.1f}s")
 
 print("Data loaded successfully")
 print(f"  Data graph: {len(data_graph)} triples")
 
-# Filter SHACL shapes to remove unsupported GeoSPARQL constraints
-print("Filtering SHACL shapes to remove unsupported GeoSPARQL functions...")
-filtered_shapes_file = download_dir / "filtered-shapes.ttl"
-
-# Load shapes into rdflib
-shapes_graph = rdflib.Graph()
-shapes_graph.parse(str(era_rinf_shapes_file), format="turtle")
-
-# Identify and remove SPARQL constraints that use unimplemented GeoSPARQL functions
-SH = rdflib.Namespace("http://www.w3.org/ns/shacl#")
-unimplemented_functions = [
-    "http://www.opengis.net/def/function/geosparql/distance",
-    "http://www.opengis.net/def/function/geosparql/sfContains",
-    "http://www.opengis.net/def/function/geosparql/sfWithin",
-    # Prefix forms as they appear in Turtle files
-    "geof:distance",
-    "geof:sfContains",
-    "geof:sfWithin",
-]
-
-removed_count = 0
-for constraint in shapes_graph.subjects(rdflib.RDF.type, SH.SPARQLConstraint):
-    for select_query in shapes_graph.objects(constraint, SH.select):
-        query_text = str(select_query)
-        if any(func in query_text for func in unimplemented_functions):
-            # Remove this constraint component
-            for triple in shapes_graph.triples((constraint, None, None)):
-                shapes_graph.remove(triple)
-            # Also remove references to this constraint
-            for s, p, o in list(shapes_graph.triples((None, None, constraint))):
-                shapes_graph.remove((s, p, o))
-            removed_count += 1
-            print(f"  Removed SPARQL constraint using GeoSPARQL function")
-            break
-
-print(f"Removed {removed_count} constraint(s) with unimplemented GeoSPARQL functions")
-
-# Apply shape fixes from queries in shape-fixes directory
-if shape_fixes_dir.exists():
-    fix_files = sorted(shape_fixes_dir.glob("*.sparql"))
-    if fix_files:
-        print(f"\nApplying {len(fix_files)} shape fix(es)...")
-        for fix_file in fix_files:
-            print(f"  Applying fix: {fix_file.name}")
-            fix_query = fix_file.read_text(encoding='utf-8')
-            shapes_graph.update(fix_query)
-        print("Shape fixes applied successfully")
-    else:
-        print("\nNo shape fixes found in shape-fixes directory")
-else:
-    print("\nShape-fixes directory not found, skipping fixes")
-
-# Save filtered shapes
-shapes_graph.serialize(destination=str(filtered_shapes_file), format="turtle")
-print(f"Filtered shapes saved to {filtered_shapes_file}")
-
 print("\nRunning SHACL validation with pyshacl...")
 _t0 = time.perf_counter()
 conforms, results_graph, results_text = pyshacl.validate(
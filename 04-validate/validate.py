@@ -1,18 +1,24 @@
+import sys
 import time
 from maplib import Model
 import polars as pl
-import rdflib
 from rdflib import Graph
 import urllib.request
 import requests
 from pathlib import Path
 from datetime import datetime
 
+# The streaming RDF converter is shared with the post-process stage
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "03-post-process"))
+import rdf_convert  # noqa: E402
+from reference_snapshot import reference_snapshot  # noqa: E402
+
 # Define paths
 data_file = Path("../03-post-process/output/era-graph-enriched.ttl")
 download_dir = Path("downloads")
 download_dir.mkdir(exist_ok=True)
 shape_fixes_dir = Path("shape-fixes")
+snapshot_dir = download_dir / "snapshot"
 
 # URLs for ERA SHACL shapes
 era_rinf_shapes_url = "https://gitlab.com/era-europa-eu/public/interoperable-data-programme/era-ontology/era-ontology/-/raw/72a053c51b87aab657f133dc175369e1337d1943/era-shacl/ERA-RINF-shapes.ttl?inline=false"
@@ -22,6 +28,15 @@ era_ontology_url = "https://gitlab.com/era-europa-eu/public/interoperable-data-p
 era_skos_api_url = "https://gitlab.com/api/v4/projects/era-europa-eu%2Fpublic%2Finteroperable-data-programme%2Fera-ontology%2Fera-ontology/repository/tree?path=era-skos&ref=main"
 era_skos_base_url = "https://gitlab.com/era-europa-eu/public/interoperable-data-programme/era-ontology/era-ontology/-/raw/main/era-skos/"
 
+# Prefixes of the Turtle validation report
+REPORT_PREFIXES = {
+    "sh": "http://www.w3.org/ns/shacl#",
+    "era": "http://data.europa.eu/949/",
+    "gsp": "http://www.opengis.net/ont/geosparql#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+}
+
 # Download SHACL shapes
 era_rinf_shapes_file = download_dir / "ERA-RINF-shapes.ttl"
 
@@ -143,96 +158,29 @@ except Exception as e:
     print("     Validation may be incomplete")
 
 
-# Load ERA ontology into data graph
-print("  Loading ERA ontology...")
+# Build or reuse the parsed reference data (ontology + SKOS, filtered shapes),
+# see reference_snapshot.py
+print("\nPreparing reference data...")
+fix_files = sorted(shape_fixes_dir.glob("*.sparql")) if shape_fixes_dir.exists() else []
+_t0 = time.perf_counter()
+snapshot = reference_snapshot(snapshot_dir, era_ontology_file, skos_files, era_rinf_shapes_file, fix_files)
+
+# Load ERA ontology and SKOS concepts into data graph
+print("  Loading ERA ontology and SKOS concepts...")
 try:
-    m.read(str(era_ontology_file), format="turtle")
-    print(f"    ✓ Loaded ontology")
+    m.read(str(snapshot["ontology"]), format="ntriples")
+    print(f"    ✓ Loaded ontology and SKOS concepts")
 except Exception as e:
     print(f"    ⚠️  Warning: Failed to load ontology: {e}")
 
-# Load SKOS files into data graph
-if skos_files:
-    print(f"  Merging {len(skos_files)} SKOS files...")
-    merged_skos_file = download_dir / "merged-skos.ttl"
-    skos_graph = rdflib.Graph()
-    for skos_file in skos_files:
-        print(f"    ... Merging {skos_file.name}")
-        try:
-            skos_graph.parse(str(skos_file), format="turtle")
-        except Exception as e:
-            print(f"    ⚠️  Warning: Failed to merge {skos_file.name}: {e}")
-    skos_graph.serialize(destination=str(merged_skos_file), format="turtle")
-    print(f"  Loading merged SKOS file ({len(skos_graph)} triples)...")
-    try:
-        m.read(str(merged_skos_file), format="turtle")
-        print(f"  ✓ Loaded merged SKOS file")
-    except Exception as e:
-        print(f"  ⚠️  Warning: Failed to load merged SKOS file: {e}")
-
 print("Data loaded successfully")
 print(f"  Total triples in data graph")
 
-# Filter SHACL shapes to remove unsupported GeoSPARQL constraints
-print("Filtering SHACL shapes to remove unsupported GeoSPARQL functions...")
-filtered_shapes_file = download_dir / "filtered-shapes.ttl"
-
-# Load shapes into rdflib
-shapes_graph = rdflib.Graph()
-shapes_graph.parse(str(era_rinf_shapes_file), format="turtle")
-
-# Identify and remove SPARQL constraints that use unimplemented GeoSPARQL functions
-SH = rdflib.Namespace("http://www.w3.org/ns/shacl#")
-unimplemented_functions = [
-    "http://www.opengis.net/def/function/geosparql/distance",
-    "http://www.opengis.net/def/function/geosparql/sfContains",
-    "http://www.opengis.net/def/function/geosparql/sfWithin",
-    # Prefix forms as they appear in Turtle files
-    "geof:distance",
-    "geof:sfContains",
-    "geof:sfWithin",
-]
-
-removed_count = 0
-for constraint in shapes_graph.subjects(rdflib.RDF.type, SH.SPARQLConstraint):
-    for select_query in shapes_graph.objects(constraint, SH.select):
-        query_text = str(select_query)
-        if any(func in query_text for func in unimplemented_functions):
-            # Remove this constraint component
-            for triple in shapes_graph.triples((constraint, None, None)):
-                shapes_graph.remove(triple)
-            # Also remove references to this constraint
-            for s, p, o in list(shapes_graph.triples((None, None, constraint))):
-                shapes_graph.remove((s, p, o))
-            removed_count += 1
-            print(f"  Removed SPARQL constraint using GeoSPARQL function")
-            break
-
-print(f"Removed {removed_count} constraint(s) with unimplemented GeoSPARQL functions")
-
-# Apply shape fixes from queries in shape-fixes directory
-if shape_fixes_dir.exists():
-    fix_files = sorted(shape_fixes_dir.glob("*.sparql"))
-    if fix_files:
-        print(f"\nApplying {len(fix_files)} shape fix(es)...")
-        for fix_file in fix_files:
-            print(f"  Applying fix: {fix_file.name}")
-            fix_query = fix_file.read_text(encoding='utf-8')
-            shapes_graph.update(fix_query)
-        print("Shape fixes applied successfully")
-    else:
-        print("\nNo shape fixes found in shape-fixes directory")
-else:
-    print("\nShape-fixes directory not found, skipping fixes")
-
-# Save filtered shapes
-shapes_graph.serialize(destination=str(filtered_shapes_file), format="turtle")
-print(f"Filtered shapes saved to {filtered_shapes_file}")
-
 # Load SHACL shapes into a specific graph
 shape_graph_uri = "https://data.europa.eu/949/era-shacl-shapes"
 print(f"Loading filtered SHACL shapes into graph {shape_graph_uri}...")
-m.read(str(filtered_shapes_file), graph=shape_graph_uri)
+m.read(str(snapshot["shapes"]), format="ntriples", graph=shape_graph_uri)
+print(f"Reference data ready in {time.perf_counter() - _t0:.1f}s")
 
 df_count = m.query("SELECT (count(?s) as ?count) WHERE { ?s ?p ?o }")
 print("Total triples count: " + str(df_count["count"][0]))
@@ -253,11 +201,16 @@ try:
     validation_model.write("output/validation-report.nt", format="ntriples")
     print("Validation report saved to output/validation-report.nt")
     
-    # Convert to Turtle format using rdflib for better readability
-    print("Converting to Turtle format using rdflib...")
-    g_validation = Graph()
-    g_validation.parse("output/validation-report.nt", format="ntriples")
-    g_validation.serialize(destination="output/validation-report.ttl", format="turtle")
+    # Convert to Turtle format for better readability, streaming (rdf_convert.py)
+    # instead of loading the whole report into an rdflib graph
+    print("Converting to Turtle format...")
+    if rdf_convert.pyoxigraph is not None:
+        rdf_convert.convert("output/validation-report.nt", "output/validation-report.ttl",
+                            prefixes=REPORT_PREFIXES)
+    else:
+        g_validation = Graph()
+        g_validation.parse("output/validation-report.nt", format="ntriples")
+        g_validation.serialize(destination="output/validation-report.ttl", format="turtle")
     print("Validation report saved to output/validation-report.ttl")
 
     query = """